@@ -1,8 +1,13 @@
-from sqlalchemy import select
+from sqlalchemy import func, select
 
-from ..services.llm import call_llm
+from ..services.llm import acall_llm
 from ..db import DocumentChunk, Citation, KeyFinding, Paper, PaperSection, PaperVersion
-from ..services.rag import enhanced_rag_search, faithfulness_check
+from ..services.rag import enhanced_rag_search, faithfulness_check, reflexion_revise
+from ..services.token_budget import USER_PROMPT_TOKENS, count_tokens, register_static_prompts, truncate_to_token_budget
+
+# Headroom for the fixed prompt labels around the question and context.
+_FRAMING_TOKENS = 64
+_MIN_CONTEXT_TOKENS = 500
 
 SYSTEM_PROMPT = """You are a research paper assistant. You help users understand and work with a generated IEEE research paper.
 
@@ -20,6 +25,8 @@ Rules:
 - Be honest if you don't have enough information
 - Keep answers concise and technical"""
 
+register_static_prompts(SYSTEM_PROMPT)
+
 
 async def chat_with_paper(
     question: str,
@@ -31,13 +38,17 @@ async def chat_with_paper(
     citations_list = await _get_citations_context(session_id, db)
     findings = await _get_findings_context(session_id, db)
 
-    context = f"Paper Sections:\n{paper_sections}\n\n"
+    parts = [f"Paper Sections:\n{paper_sections}\n\n"]
     if rag_evidence:
-        context += f"Relevant Evidence:\n{rag_evidence}\n"
+        parts.append(f"Relevant Evidence:\n{rag_evidence}\n")
     if citations_list:
-        context += f"\nCitations:\n{citations_list}\n"
+        parts.append(f"\nCitations:\n{citations_list}\n")
     if findings:
-        context += f"\nKey Findings:\n{findings}\n"
+        parts.append(f"\nKey Findings:\n{findings}\n")
+    context = truncate_to_token_budget(
+        "".join(parts),
+        max(USER_PROMPT_TOKENS - count_tokens(question) - _FRAMING_TOKENS, _MIN_CONTEXT_TOKENS),
+    )
 
     user_prompt = (
         f"User Question about the paper: {question}\n\n"
@@ -45,58 +56,50 @@ async def chat_with_paper(
         f"Answer the user's question based on the paper and its sources."
     )
 
-    answer = call_llm(SYSTEM_PROMPT, user_prompt, temperature=0.3)
+    answer = await acall_llm(SYSTEM_PROMPT, user_prompt, temperature=0.3)
 
-    verdict = faithfulness_check(answer, question, rag_evidence)
+    verdict = await faithfulness_check(answer, question, rag_evidence)
     if not verdict.get("faithful", True) and verdict.get("unsupported_claims"):
-        from ..services.rag import reflexion_revise
-        answer = reflexion_revise(answer, question, rag_evidence, verdict["unsupported_claims"])
+        answer = await reflexion_revise(answer, question, rag_evidence, verdict["unsupported_claims"])
 
     return {"answer": answer, "faithful": verdict.get("faithful", True)}
 
 
+_SECTION_TMPL = "### {}\n{}...\n\n"
+_CITATION_TMPL = "[{}] Claim: {} | Confidence: {}"
+_FINDING_TMPL = "- {}: {} (confidence: {})"
+
+
 async def _get_paper_context(session_id: str, db) -> str:
     paper_result = await db.execute(
-        select(Paper).where(Paper.session_id == session_id)
+        select(Paper.id, Paper.title, Paper.abstract).where(Paper.session_id == session_id)
     )
-    paper = paper_result.scalar_one_or_none()
+    paper = paper_result.one_or_none()
     if not paper:
         return "No paper found."
 
     sections_result = await db.execute(
-        select(PaperSection)
+        select(PaperSection.section_name, func.substr(PaperSection.content_markdown, 1, 500))
         .where(PaperSection.paper_id == paper.id)
         .order_by(PaperSection.section_order)
     )
-    sections = sections_result.scalars().all()
-
-    context = f"Title: {paper.title}\nAbstract: {paper.abstract or 'N/A'}\n\n"
-    for sec in sections:
-        context += f"### {sec.section_name}\n{sec.content_markdown[:500]}...\n\n"
-    return context
+    header = f"Title: {paper.title}\nAbstract: {paper.abstract or 'N/A'}\n\n"
+    return header + "".join(_SECTION_TMPL.format(name, preview) for name, preview in sections_result.all())
 
 
 async def _get_citations_context(session_id: str, db) -> str:
     result = await db.execute(
-        select(Citation).where(Citation.session_id == session_id).limit(15)
+        select(Citation.citation_number, func.substr(Citation.claim_text, 1, 100), Citation.confidence_score)
+        .where(Citation.session_id == session_id)
+        .limit(15)
     )
-    citations = result.scalars().all()
-    if not citations:
-        return ""
-    lines = []
-    for c in citations:
-        lines.append(f"[{c.citation_number}] Claim: {c.claim_text[:100]} | Confidence: {c.confidence_score}")
-    return "\n".join(lines)
+    return "\n".join(_CITATION_TMPL.format(*row) for row in result.all())
 
 
 async def _get_findings_context(session_id: str, db) -> str:
     result = await db.execute(
-        select(KeyFinding).where(KeyFinding.session_id == session_id).limit(10)
+        select(KeyFinding.finding_title, func.substr(KeyFinding.finding_text, 1, 200), KeyFinding.confidence_score)
+        .where(KeyFinding.session_id == session_id)
+        .limit(10)
     )
-    findings = result.scalars().all()
-    if not findings:
-        return ""
-    lines = []
-    for f in findings:
-        lines.append(f"- {f.finding_title}: {f.finding_text[:200]} (confidence: {f.confidence_score})")
-    return "\n".join(lines)
+    return "\n".join(_FINDING_TMPL.format(*row) for row in result.all())
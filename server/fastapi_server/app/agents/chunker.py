@@ -1,11 +1,10 @@
-from sqlalchemy import select
-
 from ..services.chunking import chunk_text
 from ..services.embeddings import embed_batch
 from ..services.progress import emit_progress
-from ..db import DocumentChunk, ResearchSource
+from ..db import DocumentChunk
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
+from .source_helpers import get_source_map
 
 
 async def run_chunker(state: ResearchState) -> ResearchState:
@@ -48,20 +47,20 @@ async def run_chunker(state: ResearchState) -> ResearchState:
     texts = [c["chunk_text"] for c in all_chunks]
     embeddings = await embed_batch(texts)
 
-    source_map = await _get_source_map(session_id, db)
+    source_map = await get_source_map(session_id, db)
 
-    for chunk_data, vec in zip(all_chunks, embeddings):
-        source_id = source_map.get(chunk_data["metadata"].get("source_url", ""))
-        chunk = DocumentChunk(
+    db.add_all(
+        DocumentChunk(
             session_id=session_id,
-            source_id=source_id,
+            source_id=source_map.get(chunk_data["metadata"].get("source_url", "")),
             chunk_index=chunk_data["chunk_index"],
             section_title=chunk_data["section_title"],
             chunk_text=chunk_data["chunk_text"],
             embedding=vec,
             meta_json=chunk_data["metadata"],
         )
-        db.add(chunk)
+        for chunk_data, vec in zip(all_chunks, embeddings)
+    )
 
     await db.commit()
     state["chunk_count"] = len(all_chunks)
@@ -69,11 +68,3 @@ async def run_chunker(state: ResearchState) -> ResearchState:
 
     await emit_progress(job_id, "chunker", "complete", f"Stored {len(all_chunks)} chunks with embeddings.")
     return state
-
-
-async def _get_source_map(session_id: str, db) -> dict[str, str]:
-    result = await db.execute(
-        select(ResearchSource).where(ResearchSource.session_id == session_id)
-    )
-    sources = result.scalars().all()
-    return {s.url: s.id for s in sources if s.url}
\ No newline at end of file
@@ -1,12 +1,19 @@
-import json
 import re
 
-from ..services.llm import call_llm
+from sqlalchemy import select
+
+from ..services.json_fast import JSONDecodeError, extract_json
+from ..services.llm import acall_llm
 from ..services.progress import emit_progress
 from ..services.rag import hybrid_search
-from ..db import Citation, DocumentChunk, ResearchSource
+from ..services.token_budget import register_static_prompts
+from ..db import Citation, DocumentChunk, Paper
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
+from .source_helpers import get_source_map
+
+MAX_CITED_SECTIONS = 6
+_SECTION_SPLIT_RE = re.compile(r"(?=^## )", re.MULTILINE)
 
 SYSTEM_PROMPT = """You are a citation verification agent. Given a paper section and the original source evidence, map each claim in the paper to its supporting evidence.
 
@@ -26,6 +33,8 @@ Return valid JSON with this structure:
 
 Every claim in the paper that makes a factual assertion MUST have a citation. Claims without supporting evidence should have confidence 0 and note "unsupported". Be strict - do not fabricate citations."""
 
+register_static_prompts(SYSTEM_PROMPT)
+
 
 async def run_citation(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
@@ -42,19 +51,27 @@ async def run_citation(state: ResearchState) -> ResearchState:
 
     await emit_progress(job_id, "citation", "running", "Mapping claims to source evidence...")
 
-    sections = re.split(r"(?=^## )", report, flags=re.MULTILINE)
-    section_text = ""
-    for i, sec in enumerate(sections[:6]):
-        section_text += f"\n--- Section {i + 1} ---\n{sec[:2000]}"
-
     rag_results = await hybrid_search(report[:500], session_id, db, top_k=10, min_score=0.2)
 
     if await check_cancelled(state):
         return state
 
-    source_text = ""
-    for i, r in enumerate(rag_results, 1):
-        source_text += f"[Source {i}] URL: {r['metadata'].get('source_url', 'N/A')}\nTitle: {r['section_title']}\nText: {r['chunk_text'][:800]}\n---\n"
+    if not rag_results:
+        state["citations"] = []
+        state["status"] = "cited"
+        await emit_progress(job_id, "citation", "complete", "No source evidence to map claims to.")
+        return state
+
+    # Only the first six sections go into the prompt; stop splitting there.
+    sections = _SECTION_SPLIT_RE.split(report, maxsplit=MAX_CITED_SECTIONS)[:MAX_CITED_SECTIONS]
+    section_text = "".join(
+        f"\n--- Section {i} ---\n{sec[:2000]}" for i, sec in enumerate(sections, 1)
+    )
+
+    source_text = "".join(
+        f"[Source {i}] URL: {r['metadata'].get('source_url', 'N/A')}\nTitle: {r['section_title']}\nText: {r['chunk_text'][:800]}\n---\n"
+        for i, r in enumerate(rag_results, 1)
+    )
 
     user_prompt = (
         f"Paper Sections:\n{section_text}\n\n"
@@ -62,30 +79,31 @@ async def run_citation(state: ResearchState) -> ResearchState:
         f"Map each claim in the paper to its supporting source."
     )
 
-    result = call_llm(SYSTEM_PROMPT, user_prompt, temperature=0.1)
+    result = await acall_llm(SYSTEM_PROMPT, user_prompt, temperature=0.1)
 
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        data = json.loads(json_match.group()) if json_match else json.loads(result)
-    except (json.JSONDecodeError, AttributeError):
+        data = extract_json(result)
+    except (JSONDecodeError, AttributeError):
         data = {"citations": []}
 
     citations = data.get("citations", [])
     state["citations"] = citations
     state["status"] = "cited"
 
-    source_map = await _get_source_map(session_id, db)
+    source_map = await get_source_map(session_id, db)
     chunk_map = await _get_chunk_map(session_id, db)
-    paper = await _get_paper(session_id, db)
+    # paper_writer records the id it just saved; only standalone runs look it up.
+    paper_id = state.get("paper_id") or await _get_paper_id(session_id, db)
 
-    if paper and db is not None:
+    if paper_id and db is not None:
+        rows = []
         for i, c in enumerate(citations, 1):
             source_id = source_map.get(c.get("source_url", ""))
             chunk_id = None
             if source_id:
                 chunk_id = chunk_map.get(source_id)
-            citation = Citation(
-                paper_id=paper.id,
+            rows.append(Citation(
+                paper_id=paper_id,
                 session_id=session_id,
                 section_name=None,
                 source_id=source_id,
@@ -95,36 +113,23 @@ async def run_citation(state: ResearchState) -> ResearchState:
                 citation_text=c.get("supporting_text", ""),
                 url=c.get("source_url", ""),
                 confidence_score=c.get("confidence", 0.5),
-            )
-            db.add(citation)
+            ))
+        db.add_all(rows)
         await db.commit()
 
     await emit_progress(job_id, "citation", "complete", f"Generated {len(citations)} citations.")
     return state
 
 
-async def _get_source_map(session_id: str, db) -> dict[str, str]:
-    from sqlalchemy import select
-    result = await db.execute(
-        select(ResearchSource).where(ResearchSource.session_id == session_id)
-    )
-    sources = result.scalars().all()
-    return {s.url: s.id for s in sources if s.url}
-
-
 async def _get_chunk_map(session_id: str, db) -> dict[str, str]:
-    from sqlalchemy import select
     result = await db.execute(
-        select(DocumentChunk).where(DocumentChunk.session_id == session_id)
+        select(DocumentChunk.source_id, DocumentChunk.id).where(DocumentChunk.session_id == session_id)
     )
-    chunks = result.scalars().all()
-    return {str(ch.source_id): ch.id for ch in chunks if ch.source_id}
+    return {str(source_id): chunk_id for source_id, chunk_id in result.all() if source_id}
 
 
-async def _get_paper(session_id: str, db):
-    from sqlalchemy import select
-    from ..db import Paper
+async def _get_paper_id(session_id: str, db):
     result = await db.execute(
-        select(Paper).where(Paper.session_id == session_id)
+        select(Paper.id).where(Paper.session_id == session_id)
     )
     return result.scalar_one_or_none()
\ No newline at end of file
@@ -1,17 +1,23 @@
 from ..services.search import crawl_pages
-from ..services.llm import call_llm
+from ..services.llm import acall_llm
 from ..services.progress import emit_progress
+from ..services.token_budget import truncate_to_token_budget
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
 
+# Crawled text shared across all sources, in tokens, so every source fits
+# the prompt instead of the last ones being cut off.
+CRAWL_CONTENT_TOKENS = 3000
+
 
 async def _extract_relevant_content(question: str, crawl_results: list[dict], job_id: str = "") -> str:
     content_blocks = []
+    per_source = CRAWL_CONTENT_TOKENS // max(len(crawl_results), 1)
     for item in crawl_results:
         title = item.get("title", "Untitled")
         url = item.get("url", "")
         content = item.get("content", "")
-        truncated = content[:2000]
+        truncated = truncate_to_token_budget(content, per_source)
         content_blocks.append(f"Source: {title}\nURL: {url}\nContent:\n{truncated}\n---")
 
     combined = "\n".join(content_blocks)
@@ -25,7 +31,7 @@ async def _extract_relevant_content(question: str, crawl_results: list[dict], jo
 
     user_prompt = f"Research Question: {question}\n\nCrawled Content:\n{combined}\n\nExtract and organize the key information relevant to the research question."
 
-    return call_llm(system_prompt, user_prompt, temperature=0.3)
+    return await acall_llm(system_prompt, user_prompt, temperature=0.3)
 
 
 async def run_crawler(state: ResearchState) -> ResearchState:
@@ -1,11 +1,16 @@
-import json
-import re
+import asyncio
+import hashlib
 
-from ..services.llm import call_llm
+from sqlalchemy import select
+
+from ..services.json_fast import JSONDecodeError, extract_json
+from ..services.llm import acall_llm
 from ..services.progress import emit_progress
-from ..db import RawDocument, ResearchSource
+from ..services.token_budget import register_static_prompts
+from ..db import RawDocument
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
+from .source_helpers import get_source_map
 
 SYSTEM_PROMPT = """You are a research extraction agent. Given raw web content, extract structured information.
 
@@ -39,6 +44,11 @@ Return valid JSON with this structure:
 
 If a field has no data, use an empty array or null. Do not fabricate information."""
 
+register_static_prompts(SYSTEM_PROMPT)
+
+# Sources extracted in parallel; bounded so a large crawl doesn't trip provider rate limits.
+EXTRACT_CONCURRENCY = 4
+
 
 async def run_extractor(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
@@ -55,35 +65,51 @@ async def run_extractor(state: ResearchState) -> ResearchState:
 
     await emit_progress(job_id, "extractor", "running", f"Extracting structured data from {len(crawled)} sources...")
 
-    source_map = await _get_source_map(session_id, db)
-    all_structured = []
+    source_map = await get_source_map(session_id, db)
+    hashes = [_content_hash(item.get("content", "")) for item in crawled]
+    known = await _extractions_by_hash(session_id, hashes, db)
+    semaphore = asyncio.Semaphore(EXTRACT_CONCURRENCY)
 
-    for i, item in enumerate(crawled):
-        if await check_cancelled(state):
-            return state
+    async def extract(i: int, item: dict) -> dict | None:
         content = item.get("content", "")
         url = item.get("url", "")
         title = item.get("title", "")
         if not content.strip():
-            continue
-
-        await emit_progress(job_id, "extractor", "extracting", f"Extracting source {i + 1}/{len(crawled)}: {title[:60] or url[:60]}...")
+            return None
+        cached = known.get(hashes[i])
+        if cached is not None:
+            return {**cached, "source_url": url, "source_title": title}
 
-        user_prompt = f"Extract structured information from this source.\n\nTitle: {title}\nURL: {url}\n\nContent:\n{content[:8000]}"
+        async with semaphore:
+            if await check_cancelled(state):
+                return None
+            await emit_progress(job_id, "extractor", "extracting", f"Extracting source {i + 1}/{len(crawled)}: {title[:60] or url[:60]}...")
 
-        result = call_llm(SYSTEM_PROMPT, user_prompt, temperature=0.1)
+            user_prompt = f"Extract structured information from this source.\n\nTitle: {title}\nURL: {url}\n\nContent:\n{content[:8000]}"
+            result = await acall_llm(SYSTEM_PROMPT, user_prompt, temperature=0.1)
 
         try:
-            json_match = re.search(r"\{.*\}", result, re.DOTALL)
-            parsed = json.loads(json_match.group()) if json_match else json.loads(result)
-        except (json.JSONDecodeError, AttributeError):
+            parsed = extract_json(result)
+        except (JSONDecodeError, AttributeError):
             parsed = {"summary": result[:500], "key_topics": [], "claims": []}
 
         parsed["source_url"] = url
         parsed["source_title"] = title
+        return parsed
+
+    # LLM calls overlap; the session is only touched afterwards, from this task.
+    results = await asyncio.gather(*(extract(i, item) for i, item in enumerate(crawled)))
+    if await check_cancelled(state):
+        return state
+
+    all_structured = []
+    for item, digest, parsed in zip(crawled, hashes, results):
+        if parsed is None:
+            continue
         all_structured.append(parsed)
 
-        source_id = source_map.get(url)
+        content = item.get("content", "")
+        source_id = source_map.get(item.get("url", ""))
         if source_id:
             raw_doc = RawDocument(
                 source_id=source_id,
@@ -91,6 +117,7 @@ async def run_extractor(state: ResearchState) -> ResearchState:
                 raw_html=None,
                 raw_text=content,
                 clean_text=content[:10000],
+                content_hash=digest,
                 structured_json=parsed,
                 token_count=len(content.split()),
             )
@@ -104,10 +131,21 @@ async def run_extractor(state: ResearchState) -> ResearchState:
     return state
 
 
-async def _get_source_map(session_id: str, db) -> dict[str, str]:
-    from sqlalchemy import select
+def _content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+async def _extractions_by_hash(session_id: str, hashes: list[str], db) -> dict[str, dict]:
+    """Structured data already extracted in this session, keyed by content hash.
+
+    Re-running research on a session re-crawls mostly unchanged pages; their
+    extraction is reused instead of paying for another LLM call.
+    """
     result = await db.execute(
-        select(ResearchSource).where(ResearchSource.session_id == session_id)
+        select(RawDocument.content_hash, RawDocument.structured_json).where(
+            RawDocument.session_id == session_id,
+            RawDocument.content_hash.in_(set(hashes)),
+            RawDocument.structured_json.isnot(None),
+        )
     )
-    sources = result.scalars().all()
-    return {s.url: s.id for s in sources if s.url}
\ No newline at end of file
+    return {digest: data for digest, data in result.all()}
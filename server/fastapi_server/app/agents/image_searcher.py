@@ -1,37 +1,67 @@
+import asyncio
 import logging
-import httpx
 import re
+import uuid
+from itertools import islice
 from sqlalchemy import select
 
 from ..db import Image, ResearchSource as Source
 from ..config import settings
-from ..services.llm import call_llm
+from ..services.http import get_http_client
+from ..services.llm import acall_llm
+from ..services.search import get_exa
+from ..services.token_budget import register_static_prompts
 
 logger = logging.getLogger(__name__)
 
 
+_IMAGE_EXT_RE = re.compile(r"\.(?:png|jpe?g|svg|webp)", re.IGNORECASE)
+# [^<>] keeps each attempt inside one tag; with [^>] an unclosed <img made
+# every later <img rescan to the end of the page.
+_IMG_SRC_RE = re.compile(r'<img[^<>]+src=["\']([^"\']+)["\']')
+
+CAPTION_SYSTEM_PROMPT = "Generate a brief technical caption for this image in an IEEE research paper context."
+
+register_static_prompts(CAPTION_SYSTEM_PROMPT)
+
+
+async def _page_images(page_url: str, page_title: str, limit: int, require_ext: bool = False) -> list[dict]:
+    try:
+        client = get_http_client()
+        resp = await client.get(page_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+    except Exception:
+        return []
+    if resp.status_code != 200:
+        return []
+
+    found = []
+    for match in islice(_IMG_SRC_RE.finditer(resp.text), limit):
+        img_url = match.group(1)
+        if not img_url.startswith("http"):
+            continue
+        if require_ext and not _IMAGE_EXT_RE.search(img_url):
+            continue
+        found.append({
+            "image_url": img_url,
+            "source_url": page_url,
+            "source_title": page_title,
+        })
+    return found
+
+
 async def _search_images_via_exa(query: str, max_images: int) -> list[dict]:
+    if not settings.exa_api_key:
+        return []
     try:
-        from exa_py import Exa
-        exa = Exa(api_key=settings.exa_api_key)
-        result = exa.search(f"{query} architecture diagram OR system design", num_results=max_images * 2)
-        image_urls = []
-        for r in result.results[:max_images]:
-            try:
-                async with httpx.AsyncClient(timeout=10) as client:
-                    resp = await client.get(r.url, headers={"User-Agent": "Mozilla/5.0"})
-                    if resp.status_code == 200:
-                        imgs = re.findall(r'<img[^>]+src=["\']([^"\']+)["\']', resp.text)
-                        for img_url in imgs[:2]:
-                            if img_url.startswith("http") and any(ext in img_url.lower() for ext in ['.png', '.jpg', '.jpeg', '.svg', '.webp']):
-                                image_urls.append({
-                                    "image_url": img_url,
-                                    "source_url": r.url,
-                                    "source_title": r.title or "",
-                                })
-            except Exception:
-                continue
-        return image_urls
+        exa = get_exa()
+        result = await asyncio.to_thread(
+            exa.search, f"{query} architecture diagram OR system design", num_results=max_images * 2
+        )
+        batches = await asyncio.gather(*(
+            _page_images(r.url, r.title or "", 2, require_ext=True)
+            for r in result.results[:max_images]
+        ))
+        return [img for batch in batches for img in batch]
     except Exception as e:
         logger.warning("Exa image search failed: %s", e)
         return []
@@ -51,40 +81,37 @@ async def search_images(
     )
     sources = sources_result.scalars().all()
 
-    image_urls = []
-    for src in sources:
-        if src.url and not src.url.endswith(".pdf"):
-            try:
-                async with httpx.AsyncClient(timeout=10) as client:
-                    resp = await client.get(src.url, headers={"User-Agent": "Mozilla/5.0"})
-                    if resp.status_code == 200:
-                        imgs = re.findall(r'<img[^>]+src=["\']([^"\']+)["\']', resp.text)
-                        for img_url in imgs[:3]:
-                            if img_url.startswith("http"):
-                                image_urls.append({
-                                    "image_url": img_url,
-                                    "source_url": src.url,
-                                    "source_title": src.title or "",
-                                })
-            except Exception:
-                continue
-
-    exa_images = await _search_images_via_exa(query, max_images)
+    page_fetches = [
+        _page_images(src.url, src.title or "", 3)
+        for src in sources
+        if src.url and not src.url.endswith(".pdf")
+    ]
+    *source_batches, exa_images = await asyncio.gather(
+        *page_fetches, _search_images_via_exa(query, max_images)
+    )
+    image_urls = [img for batch in source_batches for img in batch]
+
     seen_urls = {img["image_url"] for img in image_urls}
     for img in exa_images:
         if img["image_url"] not in seen_urls:
             image_urls.append(img)
             seen_urls.add(img["image_url"])
 
-    images = []
-    for i, img in enumerate(image_urls[:max_images]):
-        caption = call_llm(
-            "Generate a brief technical caption for this image in an IEEE research paper context.",
+    selected = image_urls[:max_images]
+    captions = await asyncio.gather(*(
+        acall_llm(
+            CAPTION_SYSTEM_PROMPT,
             f"Image URL: {img['image_url']}\nSource: {img['source_title']}\n\nCaption:",
             temperature=0.3,
         )
+        for img in selected
+    ))
 
+    images = []
+    records = []
+    for img, caption in zip(selected, captions):
         image_record = Image(
+            id=uuid.uuid4(),
             session_id=session_id,
             image_url=img["image_url"],
             context_url=img["source_url"],
@@ -92,8 +119,7 @@ async def search_images(
             caption=caption.strip(),
             relevance_score=0.5,
         )
-        db.add(image_record)
-        await db.commit()
+        records.append(image_record)
 
         images.append({
             "id": str(image_record.id),
@@ -102,4 +128,8 @@ async def search_images(
             "source_url": img["source_url"],
         })
 
+    if records:
+        db.add_all(records)
+        await db.commit()
+
     return images
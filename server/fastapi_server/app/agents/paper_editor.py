@@ -2,7 +2,9 @@ import difflib
 
 from sqlalchemy import select
 
-from ..services.llm import call_llm
+from ..services.json_fast import JSONDecodeError, extract_json
+from ..services.llm import acall_llm
+from ..services.token_budget import register_static_prompts
 from ..db import Paper, PaperSection, PaperVersion, DocumentChunk, Citation
 
 EDIT_SYSTEM_PROMPT = """You are an IEEE paper editor. Given a user edit request and the relevant paper section, generate an edited version.
@@ -30,6 +32,8 @@ List any unsupported claims. Return JSON:
   "suggested_fixes": ["Add citation for claim 1 from source X"]
 }"""
 
+register_static_prompts(EDIT_SYSTEM_PROMPT, CITATION_CHECK_PROMPT)
+
 
 async def edit_paper(
     session_id: str,
@@ -78,9 +82,10 @@ async def edit_paper(
         select(Citation).where(Citation.session_id == session_id).limit(10)
     )
     citations = citations_result.scalars().all()
-    citation_text = ""
-    for c in citations:
-        citation_text += f"[{c.citation_number}] {c.claim_text[:100]} (confidence: {c.confidence_score})\n"
+    citation_text = "".join(
+        f"[{c.citation_number}] {c.claim_text[:100]} (confidence: {c.confidence_score})\n"
+        for c in citations
+    )
 
     user_prompt = (
         f"Section to edit: {section.section_name}\n\n"
@@ -90,32 +95,27 @@ async def edit_paper(
         f"Generate the edited section."
     )
 
-    result = call_llm(EDIT_SYSTEM_PROMPT, user_prompt, temperature=0.3)
+    result = await acall_llm(EDIT_SYSTEM_PROMPT, user_prompt, temperature=0.3)
 
-    import json, re
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        data = json.loads(json_match.group()) if json_match else json.loads(result)
-    except (json.JSONDecodeError, AttributeError):
+        data = extract_json(result)
+    except (JSONDecodeError, AttributeError):
         data = {"edited_section": result, "change_summary": "Edited based on request", "citations_affected": []}
 
     edited = data.get("edited_section", result)
 
     if citations:
-        cite_check = call_llm(
+        cite_check = await acall_llm(
             CITATION_CHECK_PROMPT,
             f"Available citations:\n{citation_text}\n\nEdited section:\n{edited[:2000]}\n\nVerification:",
             temperature=0.1,
         )
         try:
-            import json, re
-            json_match = re.search(r"\{.*\}", cite_check, re.DOTALL)
-            if json_match:
-                cite_data = json.loads(json_match.group())
-                if not cite_data.get("claims_cited_properly", True):
-                    warnings = cite_data.get("unsupported_claims", [])
-                    data["citation_warnings"] = warnings
-        except (json.JSONDecodeError, AttributeError):
+            cite_data = extract_json(cite_check)
+            if not cite_data.get("claims_cited_properly", True):
+                warnings = cite_data.get("unsupported_claims", [])
+                data["citation_warnings"] = warnings
+        except (JSONDecodeError, AttributeError):
             pass
 
     old_text = section.content_markdown
@@ -1,16 +1,24 @@
-import json
 import re
 
+from sqlalchemy import select
+
 from ..services.llm import call_llm_stream
-from ..services.progress import emit_progress, emit_token
+from ..services.progress import TokenBuffer, emit_progress
 from ..services.rag import hybrid_search, validate_citations
-from ..services.token_budget import count_tokens, truncate_to_token_budget
+from ..services.token_budget import count_tokens, register_static_prompts, truncate_to_token_budget
 from ..db import Paper, PaperVersion, PaperSection
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
+from .source_helpers import format_source_index
 
 MAX_EVIDENCE_TOKENS = 2500
 
+# The abstract sits right after the title, so the lazy abstract match only
+# looks this far in; unterminated "abstract" mentions can't make it quadratic.
+_ABSTRACT_SEARCH_CHARS = 8000
+_ABSTRACT_RE = re.compile(r"(?i)abstract\s*\n(.*?)(?=\n\s*(?:Keywords|I\.|##))", re.DOTALL)
+_SECTION_HEADING_RE = re.compile(r"^(#{1,3}\s+|(?:I{1,3}|IV|V|VI{1,3}|VII|VIII|IX|X)\.\s+)(.+)$", re.MULTILINE)
+
 IEEE_SYSTEM_PROMPT = """You are an IEEE paper writer agent. Given a research question, key findings, and evidence, write a professional IEEE-style research paper.
 
 The paper must have these sections in order:
@@ -30,6 +38,7 @@ The paper must have these sections in order:
 
 Requirements:
 - Use proper IEEE citation format [1], [2] etc.
+- You may ONLY cite sources from the numbered "Available Sources" list; every [N] reference must match a source in it
 - Every factual claim must cite a source
 - Write in formal academic language
 - Include specific technical details from the evidence
@@ -37,6 +46,8 @@ Requirements:
 - Be comprehensive (1500-3000 words)
 - Do NOT fabricate citations or references"""
 
+register_static_prompts(IEEE_SYSTEM_PROMPT)
+
 
 async def run_paper_writer(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
@@ -56,46 +67,43 @@ async def run_paper_writer(state: ResearchState) -> ResearchState:
     if await check_cancelled(state):
         return state
 
+    crawled = state.get("crawled_content", [])
     key_findings = state.get("key_findings", [])
-    findings_text = ""
-    for i, f in enumerate(key_findings, 1):
-        findings_text += f"[Finding {i}] {f.get('title', '')}: {f.get('finding', '')}\n"
+    findings_text = "".join(
+        f"[Finding {i}] {f.get('title', '')}: {f.get('finding', '')}\n"
+        for i, f in enumerate(key_findings, 1)
+    )
 
-    evidence_text = ""
-    for i, r in enumerate(rag_results[:5], 1):
-        evidence_text += f"[Evidence {i}] {r['chunk_text'][:800]}\n---\n"
+    evidence_text = "".join(
+        f"[Evidence {i}] {r['chunk_text'][:800]}\n---\n"
+        for i, r in enumerate(rag_results[:5], 1)
+    )
     evidence_text = truncate_to_token_budget(evidence_text, MAX_EVIDENCE_TOKENS)
 
-    sources_text = ""
-    for i, item in enumerate(state.get("crawled_content", []), 1):
-        sources_text += f"[{i}] {item.get('title', 'Untitled')} - {item.get('url', '')}\n"
-
     if not findings_text.strip():
         findings_text = "No structured findings available."
     if not evidence_text.strip():
         analysis = state.get("analysis", "No evidence available.")
         evidence_text = truncate_to_token_budget(analysis, MAX_EVIDENCE_TOKENS)
 
-    source_list = [item.get("url", "") for item in state.get("crawled_content", [])]
-    source_count = len(source_list)
-    source_index_text = "\n".join(f"[{i+1}] {item.get('title', 'Untitled')} - {item.get('url', '')}" for i, item in enumerate(state.get("crawled_content", [])))
+    source_count = len(crawled)
+    source_index_text = format_source_index(crawled)
 
     user_prompt = (
         f"Research Question: {question}\n\n"
         f"Key Findings:\n{findings_text}\n\n"
         f"Evidence:\n{evidence_text}\n\n"
         f"Available Sources (numbered list — ONLY cite from these):\n{source_index_text}\n\n"
-        f"IMPORTANT: You may ONLY cite sources from the numbered list above. "
-        f"Do NOT invent or fabricate citations. Every [N] reference must match a source above.\n\n"
         f"Write a complete IEEE-style research paper."
     )
 
     await emit_progress(job_id, "paper_writer", "generating", "Generating IEEE paper sections...")
 
-    async def on_token(token: str):
-        await emit_token(job_id, token)
-
-    report = await call_llm_stream(IEEE_SYSTEM_PROMPT, user_prompt, temperature=0.4, token_callback=on_token)
+    token_buffer = TokenBuffer(job_id)
+    try:
+        report = await call_llm_stream(IEEE_SYSTEM_PROMPT, user_prompt, temperature=0.4, token_callback=token_buffer.add)
+    finally:
+        await token_buffer.flush()
 
     report, citation_violations = validate_citations(report, source_count)
     if citation_violations:
@@ -105,9 +113,8 @@ async def run_paper_writer(state: ResearchState) -> ResearchState:
     state["report"] = report
     state["status"] = "paper_written"
 
-    title = _extract_title(report)
+    title, sections = _extract_title_and_sections(report)
     abstract = _extract_abstract(report)
-    sections = _extract_sections(report)
 
     state["paper_title"] = title
     state["paper_abstract"] = abstract
@@ -138,15 +145,16 @@ async def run_paper_writer(state: ResearchState) -> ResearchState:
 
         paper.active_version_id = version.id
 
-        for i, sec in enumerate(sections):
-            ps = PaperSection(
+        db.add_all(
+            PaperSection(
                 paper_id=paper.id,
                 version_id=version.id,
                 section_name=sec.get("name", ""),
                 section_order=i,
                 content_markdown=sec.get("content", ""),
             )
-            db.add(ps)
+            for i, sec in enumerate(sections)
+        )
 
         await db.commit()
         state["paper_id"] = str(paper.id)
@@ -159,29 +167,24 @@ async def run_paper_writer(state: ResearchState) -> ResearchState:
     return state
 
 
-def _extract_title(report: str) -> str:
-    lines = report.strip().split("\n")
-    for line in lines:
-        if line.startswith("# ") or line.startswith("## "):
-            return line.lstrip("#").strip()
-    return ""
-
-
 def _extract_abstract(report: str) -> str:
-    match = re.search(r"(?i)abstract\s*\n(.*?)(?=\n\s*(?:Keywords|I\.|##))", report, re.DOTALL)
+    match = _ABSTRACT_RE.search(report, 0, _ABSTRACT_SEARCH_CHARS)
     if match:
         return match.group(1).strip()
     return ""
 
 
-def _extract_sections(report: str) -> list[dict]:
-    sections = []
-    pattern = re.compile(r"^(#{1,3}\s+|(?:I{1,3}|IV|V|VI{1,3}|VII|VIII|IX|X)\.\s+)(.+)$", re.MULTILINE)
-
-    matches = list(pattern.finditer(report))
+def _extract_title_and_sections(report: str) -> tuple[str, list[dict]]:
+    """Title (first # or ## heading) and sections from one scan of the headings."""
+    matches = list(_SECTION_HEADING_RE.finditer(report))
+    title = next(
+        (m.group(2).strip() for m in matches if m.group(1).startswith(("# ", "## "))),
+        "",
+    )
     if not matches:
-        return [{"name": "Full Report", "content": report}]
+        return title, [{"name": "Full Report", "content": report}]
 
+    sections = []
     for i, match in enumerate(matches):
         start = match.end()
         end = matches[i + 1].start() if i + 1 < len(matches) else len(report)
@@ -189,11 +192,10 @@ def _extract_sections(report: str) -> list[dict]:
         name = match.group(2).strip()
         sections.append({"name": name, "content": content})
 
-    return sections
+    return title, sections
 
 
 async def _get_existing_paper(session_id: str, db):
-    from sqlalchemy import select
     result = await db.execute(
         select(Paper).where(Paper.session_id == session_id)
     )
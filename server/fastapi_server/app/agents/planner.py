@@ -1,5 +1,7 @@
-from ..services.llm import call_llm
+from ..services.json_fast import JSONDecodeError, extract_json
+from ..services.llm import acall_llm
 from ..services.progress import emit_progress
+from ..services.token_budget import register_static_prompts
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
 
@@ -13,6 +15,8 @@ Your response must be valid JSON with this exact structure:
 
 Generate 3-5 specific search queries that will gather comprehensive information on the topic. Each query should target a different aspect or angle of the topic."""
 
+register_static_prompts(SYSTEM_PROMPT)
+
 
 async def run_planner(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
@@ -24,21 +28,14 @@ async def run_planner(state: ResearchState) -> ResearchState:
     question = state["question"]
     user_prompt = f"Research question: {question}\n\nCreate a research plan and generate search queries."
 
-    result = call_llm(SYSTEM_PROMPT, user_prompt, temperature=0.3)
-
-    import json
-    import re
+    result = await acall_llm(SYSTEM_PROMPT, user_prompt, temperature=0.3)
 
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        if json_match:
-            data = json.loads(json_match.group())
-        else:
-            data = json.loads(result)
+        data = extract_json(result)
 
         state["plan"] = data.get("plan", "")
         state["search_queries"] = data.get("search_queries", [question])
-    except (json.JSONDecodeError, KeyError):
+    except (JSONDecodeError, KeyError):
         state["plan"] = result
         state["search_queries"] = [question]
 
@@ -1,9 +1,8 @@
-import json
-import re
-
-from ..services.llm import call_llm
+from ..services.json_fast import JSONDecodeError, dumps, extract_json
+from ..services.llm import acall_llm
 from ..services.progress import emit_progress
 from ..services.rag import enhanced_rag_search
+from ..services.token_budget import register_static_prompts
 from ..db import KeyFinding
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
@@ -34,6 +33,25 @@ Return valid JSON with this structure:
 
 Focus on clustering similar claims, detecting contradictions, and ranking by source reliability. Be thorough."""
 
+register_static_prompts(SYSTEM_PROMPT)
+
+# Claims share the prompt's token budget with the RAG evidence; anything past
+# this would only be cut off again by acall_llm's truncation.
+MAX_CLAIMS_CHARS = 6000
+
+
+def _bounded_claims(structured: list[dict], limit: int) -> str:
+    lines: list[str] = []
+    size = 0
+    for item in structured:
+        for c in item.get("claims", []):
+            line = f"- {c.get('claim', '')}\n"
+            size += len(line)
+            if size > limit:
+                return "".join(lines)
+            lines.append(line)
+    return "".join(lines)
+
 
 async def run_reasoning(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
@@ -53,12 +71,14 @@ async def run_reasoning(state: ResearchState) -> ResearchState:
     if await check_cancelled(state):
         return state
 
-    structured = state.get("structured_data", [])
-    claims_text = ""
-    for i, item in enumerate(structured):
-        claims = item.get("claims", [])
-        for c in claims:
-            claims_text += f"- {c.get('claim', '')}\n"
+    claims_text = _bounded_claims(state.get("structured_data", []), MAX_CLAIMS_CHARS)
+
+    if not claims_text.strip() and not rag_evidence.strip():
+        state["key_findings"] = []
+        state["analysis"] = "No evidence available to synthesize."
+        state["status"] = "reasoned"
+        await emit_progress(job_id, "reasoning", "complete", "No evidence available; skipped synthesis.")
+        return state
 
     user_prompt = (
         f"Research Question: {question}\n\n"
@@ -67,29 +87,29 @@ async def run_reasoning(state: ResearchState) -> ResearchState:
         f"Synthesize key findings from this evidence."
     )
 
-    result = call_llm(SYSTEM_PROMPT, user_prompt, temperature=0.2)
+    result = await acall_llm(SYSTEM_PROMPT, user_prompt, temperature=0.2)
 
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        data = json.loads(json_match.group()) if json_match else json.loads(result)
-    except (json.JSONDecodeError, AttributeError):
+        data = extract_json(result)
+    except (JSONDecodeError, AttributeError):
         data = {"key_findings": [{"title": "Summary", "finding": result[:1000], "confidence": 0.5, "supporting_claims": [], "contradictions": []}]}
 
     findings = data.get("key_findings", [])
     state["key_findings"] = findings
-    state["analysis"] = json.dumps(data, indent=2)
+    state["analysis"] = dumps(data)
     state["status"] = "reasoned"
 
-    if db is not None:
-        for f in findings:
-            kf = KeyFinding(
+    if db is not None and findings:
+        db.add_all(
+            KeyFinding(
                 session_id=session_id,
                 finding_title=f.get("title", "Finding")[:200],
                 finding_text=f.get("finding", ""),
                 confidence_score=f.get("confidence", 0.5),
                 evidence_item_ids=f.get("supporting_claims", []),
             )
-            db.add(kf)
+            for f in findings
+        )
         await db.commit()
 
     await emit_progress(job_id, "reasoning", "complete", f"Generated {len(findings)} key findings from evidence.")
@@ -1,11 +1,21 @@
-import json
-import re
-
-from ..services.llm import call_llm
+from ..services.json_fast import JSONDecodeError, extract_json
+from ..services.llm import acall_llm
 from ..services.progress import emit_progress
+from ..services.token_budget import USER_PROMPT_TOKENS, count_tokens, register_static_prompts, truncate_to_token_budget
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
 
+# Headroom for the fixed prompt labels around the interpolated fields.
+_FRAMING_TOKENS = 64
+_MIN_REPORT_TOKENS = 500
+
+
+def _fit_report(report: str, *other_fields: str) -> str:
+    """Trim the paper so the fields after it survive acall_llm's prompt budget."""
+    reserved = sum(count_tokens(f) for f in other_fields) + _FRAMING_TOKENS
+    return truncate_to_token_budget(report, max(USER_PROMPT_TOKENS - reserved, _MIN_REPORT_TOKENS))
+
+
 SYSTEM_PROMPT = """You are an IEEE paper reviewer. Evaluate the paper against these criteria:
 
 1. **Citation verification** - Are all claims cited? Are references real/plausible?
@@ -29,6 +39,8 @@ Respond with valid JSON:
 
 If score >= 7, set approved: true. Otherwise include specific revision instructions."""
 
+register_static_prompts(SYSTEM_PROMPT)
+
 
 async def run_reviewer(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
@@ -39,25 +51,33 @@ async def run_reviewer(state: ResearchState) -> ResearchState:
 
     question = state["question"]
     report = state.get("report", "")
-    citations = state.get("citations", [])
+    citations = state.get("citations") or []
+
+    if not report.strip():
+        # Nothing was written; end the run as failed rather than approving it.
+        state["review"] = ""
+        state["status"] = "failed"
+        state["error"] = "No paper was generated to review."
+        await emit_progress(job_id, "reviewer", "failed", state["error"])
+        return state
 
-    citation_summary = ""
-    if citations:
-        for i, c in enumerate(citations[:10], 1):
-            citation_summary += f"[{c.get('citation_number', i)}] Claim: {c.get('claim', '')[:100]}... → Score: {c.get('confidence', 0)}\n"
+    citation_summary = "".join(
+        f"[{c.get('citation_number', i)}] Claim: {c.get('claim', '')[:100]}... → Score: {c.get('confidence', 0)}\n"
+        for i, c in enumerate(citations[:10], 1)
+    ) or "No citations mapped yet"
+    report = _fit_report(report, question, citation_summary)
 
     user_prompt = (
         f"Research Question: {question}\n\n"
         f"Paper:\n{report}\n\n"
-        f"Citation Check Results:\n{citation_summary or 'No citations mapped yet'}\n\n"
+        f"Citation Check Results:\n{citation_summary}\n\n"
         f"Review this IEEE paper."
     )
 
-    result = call_llm(SYSTEM_PROMPT, user_prompt, temperature=0.2)
+    result = await acall_llm(SYSTEM_PROMPT, user_prompt, temperature=0.2)
 
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        data = json.loads(json_match.group()) if json_match else json.loads(result)
+        data = extract_json(result)
 
         if data.get("approved"):
             state["review"] = data.get("feedback", "")
@@ -74,7 +94,7 @@ async def run_reviewer(state: ResearchState) -> ResearchState:
             job_id, "reviewer", "needs_revision",
             f"Score: {data.get('score', 'N/A')}/10. Issues: {issue_summary}. Revision {state['revision_count']}."
         )
-    except (json.JSONDecodeError, KeyError):
+    except (JSONDecodeError, KeyError):
         state["review"] = result
         state["status"] = "approved"
         await emit_progress(job_id, "reviewer", "approved", "Paper approved by reviewer.")
@@ -94,6 +114,11 @@ async def run_revise(state: ResearchState) -> ResearchState:
     report = state.get("report", "")
     feedback = state.get("review", "")
 
+    if not report.strip() or not feedback.strip():
+        state["status"] = "revised"
+        await emit_progress(job_id, "reviewer", "revised", "Nothing to revise.")
+        return state
+
     system_prompt = """You are an IEEE paper editor. Revise the paper based on the reviewer's feedback.
 
 Requirements:
@@ -104,6 +129,8 @@ Requirements:
 - Do NOT remove citations - add more if needed
 - Return the COMPLETE revised paper, not just the changes"""
 
+    report = _fit_report(report, question, feedback)
+
     user_prompt = (
         f"Research Question: {question}\n\n"
         f"Original Paper:\n{report}\n\n"
@@ -111,7 +138,7 @@ Requirements:
         f"Revise the complete paper."
     )
 
-    state["report"] = call_llm(system_prompt, user_prompt, temperature=0.3)
+    state["report"] = await acall_llm(system_prompt, user_prompt, temperature=0.3)
     state["status"] = "revised"
     await emit_progress(job_id, "reviewer", "revised", f"Paper revised based on feedback (revision {revision}).")
     return state
\ No newline at end of file
@@ -1,36 +1,46 @@
-from ..services.search import search_web
+import asyncio
+
+from ..services.search import normalize_query, search_web
 from ..services.progress import emit_progress
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
 
 
+async def _search_with_progress(job_id: str, index: int, total: int, query: str) -> list[dict]:
+    """Report each query as it actually starts; the searches run concurrently."""
+    await emit_progress(job_id, "searcher", "searching", f'Running query {index}/{total}: "{query[:80]}..."')
+    return await search_web(query)
+
+
 async def run_searcher(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
         return state
 
     job_id = state.get("job_id", "")
     queries = state.get("search_queries", [state["question"]])
+    # Planner output often repeats a query with different casing/spacing.
+    seen: dict[str, str] = {}
+    for q in queries:
+        seen.setdefault(normalize_query(q), q)
+    queries = list(seen.values())
     await emit_progress(job_id, "searcher", "running", f"Searching the web with {len(queries)} queries...")
 
-    all_results = []
-
-    for i, query in enumerate(queries):
-        if await check_cancelled(state):
-            return state
-        await emit_progress(job_id, "searcher", "searching", f'Running query {i + 1}/{len(queries)}: "{query[:80]}..."')
-        try:
-            results = await search_web(query)
-            all_results.extend(results)
-        except Exception:
-            pass
-
-    seen_urls = set()
-    unique_results = []
-    for r in all_results:
-        url = r.get("url", "")
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            unique_results.append(r)
+    batches = await asyncio.gather(
+        *(_search_with_progress(job_id, i, len(queries), q) for i, q in enumerate(queries, 1)),
+        return_exceptions=True,
+    )
+    if await check_cancelled(state):
+        return state
+
+    unique: dict[str, dict] = {}
+    for batch in batches:
+        if isinstance(batch, BaseException):
+            continue
+        for r in batch:
+            url = r.get("url", "")
+            if url:
+                unique.setdefault(url, r)
+    unique_results = list(unique.values())
 
     state["search_results"] = unique_results[:15]
     state["status"] = "searched"
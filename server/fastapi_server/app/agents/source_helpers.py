@@ -0,0 +1,19 @@
+from sqlalchemy import select
+
+from ..db import ResearchSource
+
+
+async def get_source_map(session_id: str, db) -> dict[str, str]:
+    """Map each stored source URL in the session to its ResearchSource id."""
+    result = await db.execute(
+        select(ResearchSource.url, ResearchSource.id).where(ResearchSource.session_id == session_id)
+    )
+    return {url: source_id for url, source_id in result.all() if url}
+
+
+def format_source_index(crawled_content: list[dict]) -> str:
+    """Numbered "[N] title - url" list the writers tell the LLM to cite from."""
+    return "\n".join(
+        f"[{i}] {item.get('title', 'Untitled')} - {item.get('url', '')}"
+        for i, item in enumerate(crawled_content, 1)
+    )
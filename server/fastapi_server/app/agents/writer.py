@@ -1,9 +1,10 @@
 from ..services.llm import call_llm_stream
-from ..services.progress import emit_progress, emit_token
+from ..services.progress import TokenBuffer, emit_progress
 from ..services.rag import hybrid_search, validate_citations
-from ..services.token_budget import count_tokens, truncate_to_token_budget
+from ..services.token_budget import count_tokens, register_static_prompts, truncate_to_token_budget
 from .types import ResearchState
 from .cancel_helpers import check_cancelled
+from .source_helpers import format_source_index
 
 MAX_EVIDENCE_TOKENS = 2500
 
@@ -14,12 +15,16 @@ Requirements:
 - Start with a title (##) and an executive summary
 - Include 4-6 sections with clear headings
 - Cite sources in brackets like [1], [2] etc. based on the source order from the evidence
+- You may ONLY cite sources from the numbered "Available Sources" list; every [N] reference must match a source in it
+- Do NOT invent or fabricate citations
 - Include a Sources section at the end listing all URLs
 - Use professional academic/technical language
 - Be thorough but concise
 - Include specific facts, data points, and findings from the retrieved evidence
 - End with a conclusion section"""
 
+register_static_prompts(SYSTEM_PROMPT)
+
 
 async def run_writer(state: ResearchState) -> ResearchState:
     if state.get("error") or await check_cancelled(state):
@@ -40,53 +45,37 @@ async def run_writer(state: ResearchState) -> ResearchState:
     if await check_cancelled(state):
         return state
 
-    evidence_text = ""
-    for i, r in enumerate(rag_results[:5], 1):
-        text = r["chunk_text"][:800]
-        sec = r["section_title"] or "General"
-        evidence_text += f"[Evidence {i}] Section: {sec}\n{text}\n---\n"
+    evidence_text = "".join(
+        f"[Evidence {i}] Section: {r['section_title'] or 'General'}\n{r['chunk_text'][:800]}\n---\n"
+        for i, r in enumerate(rag_results[:5], 1)
+    )
     evidence_text = truncate_to_token_budget(evidence_text, MAX_EVIDENCE_TOKENS)
 
-    sources_text = ""
-    for i, item in enumerate(state.get("crawled_content", []), 1):
-        title = item.get("title", "Untitled")
-        url = item.get("url", "")
-        sources_text += f"[{i}] {title} - {url}\n"
-
     if not rag_results:
         await emit_progress(job_id, "writer", "rag_fallback", "No RAG results found, using full analysis.")
         analysis = state.get("analysis", "No analysis available")
         evidence_text = truncate_to_token_budget(analysis, MAX_EVIDENCE_TOKENS)
 
-        for i, item in enumerate(state.get("search_results", []), 1):
-            title = item.get("title", "Untitled")
-            url = item.get("url", "")
-            if url and url not in "".join(
-                s.get("url", "") for s in state.get("crawled_content", [])
-            ):
-                sources_text += f"[{len(state.get('crawled_content', [])) + i}] {title} - {url}\n"
-
-    source_list = [item.get("url", "") for item in state.get("crawled_content", [])]
-    source_count = len(source_list)
-    source_index_text = "\n".join(f"[{i+1}] {item.get('title', 'Untitled')} - {item.get('url', '')}" for i, item in enumerate(state.get("crawled_content", [])))
+    crawled = state.get("crawled_content", [])
+    source_count = len(crawled)
+    source_index_text = format_source_index(crawled)
 
     user_prompt = (
         f"Research Question: {question}\n\n"
         f"Research Plan: {plan}\n\n"
         f"Retrieved Evidence:\n{evidence_text}\n\n"
         f"Available Sources (numbered list — ONLY cite from these):\n{source_index_text}\n\n"
-        f"IMPORTANT: You may ONLY cite sources from the numbered list above. "
-        f"Do NOT invent or fabricate citations. Every [N] reference must match a source above.\n\n"
         f"Write the research report."
     )
 
     await emit_progress(job_id, "writer", "generating", "Generating report from evidence...")
     rag_count = len(rag_results)
 
-    async def on_token(token: str):
-        await emit_token(job_id, token)
-
-    state["report"] = await call_llm_stream(SYSTEM_PROMPT, user_prompt, temperature=0.5, token_callback=on_token)
+    token_buffer = TokenBuffer(job_id)
+    try:
+        state["report"] = await call_llm_stream(SYSTEM_PROMPT, user_prompt, temperature=0.5, token_callback=token_buffer.add)
+    finally:
+        await token_buffer.flush()
 
     state["report"], citation_violations = validate_citations(state["report"], source_count)
     if citation_violations:
@@ -20,6 +20,7 @@ class Settings(BaseSettings):
     cerebras_model: str = "gemma-4-31b"
 
     llm_request_timeout: int = 60
+    llm_max_concurrency: int = 8
     max_context_messages: int = 12
 
     web_search_provider: Literal["duckduckgo", "tavily", "brave", "exa", "searchspace"] = "exa"
@@ -28,6 +29,7 @@ class Settings(BaseSettings):
     exa_api_key: str = ""
     searchspace_api_key: str = ""
     web_max_search_results: int = 10
+    web_search_cache_ttl: int = 3600
     web_max_sources_to_crawl: int = 5
     web_crawl_timeout: int = 60
     web_crawl_concurrency: int = 3
@@ -39,6 +41,7 @@ class Settings(BaseSettings):
     embedding_provider: Literal["local", "openai"] = "local"
     embedding_model: str = "all-MiniLM-L6-v2"
     embedding_dimension: int = 384
+    embedding_backend: Literal["torch", "onnx", "openvino"] = "torch"
     openai_api_key: str = ""
     openai_base_url: str = ""
     openai_embedding_model: str = "text-embedding-3-small"
@@ -47,6 +50,7 @@ class Settings(BaseSettings):
     chunk_overlap: int = 150
     top_k_retrieval: int = 5
     min_retrieval_score: float = 0.30
+    reranker_quantize: bool = False
 
     feature_document_rag: bool = True
     feature_web_research: bool = True
@@ -13,60 +13,25 @@ from .agents.reasoning import run_reasoning
 from .agents.paper_writer import run_paper_writer
 from .agents.citation import run_citation
 from .agents.reviewer import run_reviewer, run_revise
-from .services.progress import emit_progress
+from .services.progress import emit_progress, is_job_cancelled
 from .services.llm import LLMError, USER_FRIENDLY_ERROR
 
 
-def router_planner(state: ResearchState) -> Literal["searcher", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "searcher"
-
-
-def router_searcher(state: ResearchState) -> Literal["crawler", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "crawler"
+def _should_stop(state: ResearchState) -> bool:
+    return bool(state.get("error") or state.get("cancelled"))
 
 
-def router_crawler(state: ResearchState) -> Literal["extractor", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "extractor"
+def _route_to(next_node: str):
+    """Router for a linear step: continue to next_node unless the run stopped."""
+    def route(state: ResearchState) -> str:
+        return "end" if _should_stop(state) else next_node
 
-
-def router_extractor(state: ResearchState) -> Literal["chunker", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "chunker"
-
-
-def router_chunker(state: ResearchState) -> Literal["reasoning", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "reasoning"
-
-
-def router_reasoning(state: ResearchState) -> Literal["paper_writer", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "paper_writer"
-
-
-def router_paper_writer(state: ResearchState) -> Literal["citation", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "citation"
-
-
-def router_citation(state: ResearchState) -> Literal["reviewer", "end"]:
-    if state.get("error") or state.get("cancelled"):
-        return "end"
-    return "reviewer"
+    route.__name__ = f"route_to_{next_node}"
+    return route
 
 
 def router_reviewer(state: ResearchState) -> Literal["revise", "end"]:
-    if state.get("error") or state.get("cancelled"):
+    if _should_stop(state):
         return "end"
     if state.get("status") == "approved":
         return "end"
@@ -75,6 +40,18 @@ def router_reviewer(state: ResearchState) -> Literal["revise", "end"]:
     return "revise"
 
 
+_PIPELINE = (
+    ("planner", "searcher"),
+    ("searcher", "crawler"),
+    ("crawler", "extractor"),
+    ("extractor", "chunker"),
+    ("chunker", "reasoning"),
+    ("reasoning", "paper_writer"),
+    ("paper_writer", "citation"),
+    ("citation", "reviewer"),
+)
+
+
 def build_research_graph() -> StateGraph:
     builder = StateGraph(ResearchState)
 
@@ -91,38 +68,11 @@ def build_research_graph() -> StateGraph:
 
     builder.set_entry_point("planner")
 
-    builder.add_conditional_edges("planner", router_planner, {
-        "searcher": "searcher",
-        "end": END,
-    })
-    builder.add_conditional_edges("searcher", router_searcher, {
-        "crawler": "crawler",
-        "end": END,
-    })
-    builder.add_conditional_edges("crawler", router_crawler, {
-        "extractor": "extractor",
-        "end": END,
-    })
-    builder.add_conditional_edges("extractor", router_extractor, {
-        "chunker": "chunker",
-        "end": END,
-    })
-    builder.add_conditional_edges("chunker", router_chunker, {
-        "reasoning": "reasoning",
-        "end": END,
-    })
-    builder.add_conditional_edges("reasoning", router_reasoning, {
-        "paper_writer": "paper_writer",
-        "end": END,
-    })
-    builder.add_conditional_edges("paper_writer", router_paper_writer, {
-        "citation": "citation",
-        "end": END,
-    })
-    builder.add_conditional_edges("citation", router_citation, {
-        "reviewer": "reviewer",
-        "end": END,
-    })
+    for node, next_node in _PIPELINE:
+        builder.add_conditional_edges(node, _route_to(next_node), {
+            next_node: next_node,
+            "end": END,
+        })
     builder.add_conditional_edges("reviewer", router_reviewer, {
         "revise": "revise",
         "end": END,
@@ -132,6 +82,20 @@ def build_research_graph() -> StateGraph:
     return builder.compile()
 
 
+_research_graph = None
+
+
+def get_research_graph():
+    """Compiled research graph, built once and reused across runs.
+
+    The compiled graph holds no per-run state, so concurrent jobs can share it.
+    """
+    global _research_graph
+    if _research_graph is None:
+        _research_graph = build_research_graph()
+    return _research_graph
+
+
 async def run_research(
     question: str,
     session_id: str,
@@ -140,7 +104,6 @@ async def run_research(
     db: AsyncSession | None = None,
 ) -> dict:
     # Check if job was cancelled before starting
-    from .services.progress import is_job_cancelled
     if await is_job_cancelled(job_id):
         return {
             "report": "Research cancelled by user.",
@@ -182,7 +145,7 @@ async def run_research(
         "paper_sections": [],
     }
 
-    graph = build_research_graph()
+    graph = get_research_graph()
     try:
         final_state = await graph.ainvoke(initial_state)
     except LLMError as e:
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-import json
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
@@ -26,14 +26,11 @@ from ..db import get_db
 router = APIRouter(prefix="/internal/agents", tags=["agents"])
 
 
-_DEFAULT_STATE: dict[str, Any] = {
+_DEFAULT_STATE: Mapping[str, Any] = MappingProxyType({
     "question": "",
     "session_id": "",
     "job_id": "",
     "plan": "",
-    "search_queries": [],
-    "search_results": [],
-    "crawled_content": [],
     "analysis": "",
     "report": "",
     "review": "",
@@ -43,20 +40,28 @@ _DEFAULT_STATE: dict[str, Any] = {
     "error": None,
     "chunk_count": 0,
     "db": None,
-    "structured_data": [],
-    "key_findings": [],
-    "citations": [],
     "paper_id": "",
     "paper_title": "",
     "paper_abstract": "",
-    "paper_sections": [],
-}
+})
+
+# List fields get a fresh list per state so requests never share one.
+_LIST_FIELDS = (
+    "search_queries",
+    "search_results",
+    "crawled_content",
+    "structured_data",
+    "key_findings",
+    "citations",
+    "paper_sections",
+)
 
 
 def _make_state(**kwargs: Any) -> ResearchState:
-    merged = dict(_DEFAULT_STATE)
-    merged.update(kwargs)
-    return ResearchState(**merged)
+    state: ResearchState = {**_DEFAULT_STATE, **kwargs}
+    for field in _LIST_FIELDS:
+        state.setdefault(field, [])
+    return state
 
 
 # ─── Request Models ──────────────────────────────────────────────────────────
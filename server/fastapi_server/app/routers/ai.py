@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import json
-import re
 from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
@@ -21,7 +19,17 @@ from ..services.generator import (
     faithful_gen,
     tracking_gen,
 )
-from ..services.llm import call_llm as _call_llm
+from ..services import json_fast
+from ..services.json_fast import JSONDecodeError, extract_json
+from ..services.llm import acall_llm as _acall_llm
+from ..services.token_budget import join_within_budget
+from ..services.prompts import (
+    CONTEXT_COMPRESS_PROMPT,
+    FAITHFULNESS_PROMPT,
+    REFLEXION_PROMPT,
+    REWRITE_QUERY_PROMPT,
+    SUB_QUESTIONS_PROMPT,
+)
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
@@ -76,14 +84,16 @@ class ReflexionRequest(BaseModel):
     unsupported_claims: list[str]
 
 
+_GENERATORS: dict[str, BaseGenerator] = {
+    "base": gen,
+    "streaming": streaming_gen,
+    "faithful": faithful_gen,
+    "tracking": tracking_gen,
+}
+
+
 def _select_generator(kind: str) -> BaseGenerator:
-    mapping: dict[str, BaseGenerator] = {
-        "base": gen,
-        "streaming": streaming_gen,
-        "faithful": faithful_gen,
-        "tracking": tracking_gen,
-    }
-    return mapping.get(kind, gen)
+    return _GENERATORS.get(kind, gen)
 
 
 @router.post("/generate", response_model=GenerateResponse)
@@ -131,7 +141,7 @@ async def _stream_generator(g: BaseGenerator, req: GenerateRequest, db):
         msgs_dict = [m.model_dump() for m in req.messages]
 
     async def token_cb(token: str):
-        yield f"data: {json.dumps({'token': token})}\n\n"
+        yield f"data: {json_fast.dumps({'token': token})}\n\n"
 
     result = await g.generate_stream(
         prompt=req.prompt,
@@ -146,14 +156,13 @@ async def _stream_generator(g: BaseGenerator, req: GenerateRequest, db):
         db=db,
     )
 
-    yield f"data: {json.dumps({'done': True, 'content': result.content, 'usage': result.usage.to_dict() if result.usage else None})}\n\n"
+    yield f"data: {json_fast.dumps({'done': True, 'content': result.content, 'usage': result.usage.to_dict() if result.usage else None})}\n\n"
 
 
 @router.post("/rewrite")
 async def rewrite_query(req: RewriteRequest):
-    result = _call_llm(
-        "You rewrite user questions into precise, self-contained search queries for a RAG system. "
-        "Remove ambiguity, add technical terms, keep it a single sentence.",
+    result = await _acall_llm(
+        REWRITE_QUERY_PROMPT,
         f"Original: {req.query}\n\nRewritten query:",
         temperature=0.2,
     )
@@ -162,23 +171,18 @@ async def rewrite_query(req: RewriteRequest):
 
 @router.post("/sub-questions")
 async def sub_questions(req: SubQuestionsRequest):
-    result = _call_llm(
-        "Break the following research question into 2-3 specific sub-questions. "
-        "Return as a JSON list of strings only. Example: [\"sub question 1\", \"sub question 2\"]",
+    result = await _acall_llm(
+        SUB_QUESTIONS_PROMPT,
         f"Question: {req.query}\n\nSub-questions (JSON list):",
         temperature=0.2,
     )
     try:
-        json_match = re.search(r"\[.*?\]", result, re.DOTALL)
-        if json_match:
-            parsed = json.loads(json_match.group())
-            if parsed and isinstance(parsed, list) and isinstance(parsed[0], dict):
-                sub_qs = [list(d.values())[0] for d in parsed]
-            else:
-                sub_qs = parsed
+        parsed = extract_json(result, "[")
+        if parsed and isinstance(parsed, list) and isinstance(parsed[0], dict):
+            sub_qs = [list(d.values())[0] for d in parsed]
         else:
-            sub_qs = [req.query]
-    except (json.JSONDecodeError, IndexError):
+            sub_qs = parsed
+    except (JSONDecodeError, IndexError):
         sub_qs = [req.query]
 
     return {"sub_questions": sub_qs}
@@ -186,18 +190,18 @@ async def sub_questions(req: SubQuestionsRequest):
 
 @router.post("/context-compress")
 async def context_compress(req: ContextCompressRequest):
-    raw_ctx = "\n\n---\n\n".join(
-        f"[{r.get('section_title') or 'Untitled'}] {r.get('chunk_text', r.get('text', ''))}"
-        for r in req.chunks
+    raw_ctx = join_within_budget(
+        (
+            f"[{r.get('section_title') or 'Untitled'}] {r.get('chunk_text', r.get('text', ''))}"
+            for r in req.chunks
+        ),
+        "\n\n---\n\n",
     )
     if not raw_ctx.strip():
         return {"compressed": ""}
 
-    compressed = _call_llm(
-        "You are a context compression system. Extract ONLY the sentences and facts "
-        "from the provided context that are directly relevant to answering the question. "
-        "Remove irrelevant information. Preserve exact wording of relevant sentences. "
-        "Keep all technical terms, numbers, and proper names intact.",
+    compressed = await _acall_llm(
+        CONTEXT_COMPRESS_PROMPT,
         f"Question: {req.query}\n\nContext:\n{raw_ctx}\n\nCompressed relevant context:",
         temperature=0.1,
     )
@@ -211,20 +215,14 @@ async def faithfulness_check(req: FaithfulnessCheckRequest):
     if not req.context.strip():
         return {"faithful": True, "unsupported_claims": [], "score": 10}
 
-    result = _call_llm(
-        "You are a faithfulness verifier. Given an answer and the source context, "
-        "identify any claims in the answer that are NOT supported by the context. "
-        "Return JSON: {\"faithful\": true/false, \"unsupported_claims\": [\"...\"], \"score\": 0-10}",
+    result = await _acall_llm(
+        FAITHFULNESS_PROMPT,
         f"Context:\n{req.context}\n\nAnswer:\n{req.answer}\n\nVerification:",
         temperature=0.1,
     )
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        if json_match:
-            verdict = json.loads(json_match.group())
-        else:
-            verdict = {"faithful": True, "unsupported_claims": [], "score": 10}
-    except (json.JSONDecodeError, AttributeError):
+        verdict = extract_json(result)
+    except (JSONDecodeError, AttributeError):
         verdict = {"faithful": True, "unsupported_claims": [], "score": 10}
 
     return verdict
@@ -232,10 +230,8 @@ async def faithfulness_check(req: FaithfulnessCheckRequest):
 
 @router.post("/reflexion")
 async def reflexion_revise(req: ReflexionRequest):
-    revised = _call_llm(
-        "You are a research assistant. Your previous answer contained unsupported claims. "
-        "Revise it to ONLY include information supported by the provided context. "
-        "If the context doesn't fully answer the question, say so explicitly.",
+    revised = await _acall_llm(
+        REFLEXION_PROMPT,
         f"Context:\n{req.context}\n\nPrevious Answer:\n{req.answer}\n\n"
         f"Unsupported Claims:\n{chr(10).join(req.unsupported_claims)}\n\nRevised Answer:",
         temperature=0.2,
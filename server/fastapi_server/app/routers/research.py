@@ -1,3 +1,6 @@
+import asyncio
+import logging
+import threading
 import uuid
 from datetime import datetime, timezone
 
@@ -11,6 +14,8 @@ from ..db import ResearchSessionStatus
 from ..graph import run_research
 from ..services.progress import emit_progress, cancel_job, clear_cancel_flag
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/research", tags=["research"])
 
 _GREETING_REPLY = (
@@ -18,31 +23,41 @@ _GREETING_REPLY = (
     "analyze sources, and compile a structured report for you."
 )
 
-try:
-    from semantic_router import Route, RouteLayer
-    from semantic_router.encoders import HuggingFaceEncoder
-
-    _greeting_route = Route(
-        name="greeting",
-        utterances=[
-            "hi", "hello", "hey", "good morning", "sup", "how are you",
-            "what's up", "hey there", "hi bot", "good afternoon", "yo",
-            "howdy", "what's good", "how's it going", "good evening",
-            "who are you", "what can you do", "tell me about yourself",
-            "thanks", "thank you", "bye", "goodbye", "see ya",
-        ],
-    )
-    _encoder = HuggingFaceEncoder(name="all-MiniLM-L6-v2")
-    _router = RouteLayer(encoder=_encoder, routes=[_greeting_route])
-    _SEMANTIC_ROUTER_AVAILABLE = True
-except Exception:
-    _SEMANTIC_ROUTER_AVAILABLE = False
+_GREETING_UTTERANCES = [
+    "hi", "hello", "hey", "good morning", "sup", "how are you",
+    "what's up", "hey there", "hi bot", "good afternoon", "yo",
+    "howdy", "what's good", "how's it going", "good evening",
+    "who are you", "what can you do", "tell me about yourself",
+    "thanks", "thank you", "bye", "goodbye", "see ya",
+]
+
+_greeting_router = None
+_greeting_router_failed = False
+_greeting_router_lock = threading.Lock()
+
+
+def _get_greeting_router():
+    global _greeting_router, _greeting_router_failed
+    if _greeting_router is None and not _greeting_router_failed:
+        with _greeting_router_lock:
+            if _greeting_router is None and not _greeting_router_failed:
+                try:
+                    from semantic_router import Route, RouteLayer
+                    from semantic_router.encoders import HuggingFaceEncoder
+
+                    greeting_route = Route(name="greeting", utterances=_GREETING_UTTERANCES)
+                    _greeting_router = RouteLayer(encoder=HuggingFaceEncoder(name="all-MiniLM-L6-v2"), routes=[greeting_route])
+                except Exception as e:
+                    _greeting_router_failed = True
+                    logger.warning("Semantic router unavailable, greeting detection disabled: %s", e)
+    return _greeting_router
 
 
 def _is_greeting_only(text: str) -> str | None:
-    if not _SEMANTIC_ROUTER_AVAILABLE:
+    router_layer = _get_greeting_router()
+    if router_layer is None:
         return None
-    matched = _router(text)
+    matched = router_layer(text)
     return _GREETING_REPLY if matched.name == "greeting" else None
 
 
@@ -90,7 +105,7 @@ async def start_research(req: ResearchRequest, db: AsyncSession = Depends(get_db
     db.add(msg)
     await db.commit()
 
-    greeting_reply = _is_greeting_only(req.question)
+    greeting_reply = await asyncio.to_thread(_is_greeting_only, req.question)
     if greeting_reply:
         session.status = ResearchSessionStatus.completed
         session.updated_at = datetime.now(timezone.utc)
@@ -139,13 +154,14 @@ async def start_research(req: ResearchRequest, db: AsyncSession = Depends(get_db
     )
     db.add(report_msg)
 
-    for src in result["sources"]:
-        source = ResearchSource(
+    db.add_all(
+        ResearchSource(
             session_id=session.id,
             url=src["url"],
             title=src["title"],
         )
-        db.add(source)
+        for src in result["sources"]
+    )
 
     report_record = ResearchReport(
         session_id=session.id,
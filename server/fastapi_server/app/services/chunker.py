@@ -6,6 +6,8 @@ from typing import Any
 CHUNK_SIZE = 1200
 CHUNK_OVERLAP = 200
 
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+
 
 def split_text(
     text: str,
@@ -15,7 +17,7 @@ def split_text(
     if not text.strip():
         return []
 
-    paragraphs = re.split(r"\n\s*\n", text)
+    paragraphs = _PARAGRAPH_BREAK_RE.split(text)
     chunks: list[dict[str, Any]] = []
     current: list[str] = []
     current_len = 0
@@ -1,6 +1,10 @@
 import re
 from ..config import settings
 
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
+_PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
 
 def chunk_text(text: str, source_url: str = "", source_title: str = "") -> list[dict]:
     sections = _split_by_headings(text)
@@ -29,8 +33,7 @@ def chunk_text(text: str, source_url: str = "", source_title: str = "") -> list[
 
 
 def _split_by_headings(text: str) -> list[tuple[str, str]]:
-    pattern = re.compile(r"^(#{1,3})\s+(.+)$", re.MULTILINE)
-    splits = list(pattern.finditer(text))
+    splits = list(_HEADING_RE.finditer(text))
 
     if not splits:
         return [("", text.strip())]
@@ -44,22 +47,17 @@ def _split_by_headings(text: str) -> list[tuple[str, str]]:
             between = text[prev_end:start].strip()
             if between:
                 sections.append(("", between))
-        heading_level = len(match.group(1))
-        heading_text = match.group(2).strip()
         prev_end = match.end()
 
     remaining = text[prev_end:].strip()
     if remaining:
-        last_heading_match = list(pattern.finditer(text))
-        if last_heading_match:
-            last = last_heading_match[-1]
-            sections.append((last.group(2).strip(), remaining))
+        sections.append((splits[-1].group(2).strip(), remaining))
 
     return sections
 
 
 def _split_section(text: str, chunk_size: int, overlap: int) -> list[str]:
-    paragraphs = re.split(r"\n\s*\n", text)
+    paragraphs = _PARAGRAPH_BREAK_RE.split(text)
     paragraphs = [p.strip() for p in paragraphs if p.strip()]
 
     chunks = []
@@ -84,7 +82,7 @@ def _split_section(text: str, chunk_size: int, overlap: int) -> list[str]:
 
 
 def _split_long_paragraph(text: str, chunk_size: int, overlap: int) -> list[str]:
-    sentences = re.split(r"(?<=[.!?])\s+", text)
+    sentences = _SENTENCE_END_RE.split(text)
     chunks = []
     current = ""
     for sentence in sentences:
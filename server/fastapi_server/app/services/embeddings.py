@@ -1,33 +1,95 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
 import numpy as np
 from ..config import settings
+from . import json_fast
+from .http import get_http_client
+
+logger = logging.getLogger(__name__)
 
 _encoder = None
 
+_QUERY_CACHE_SIZE = 256
+_query_cache: OrderedDict[str, list[float]] = OrderedDict()
+_inflight: dict[str, asyncio.Future] = {}
+
 
 def _get_local_encoder():
     global _encoder
     if _encoder is None:
         from sentence_transformers import SentenceTransformer
+
+        backend = settings.embedding_backend
+        if backend != "torch":
+            # Needs sentence-transformers>=3.2 with the matching extra installed.
+            try:
+                _encoder = SentenceTransformer(settings.embedding_model, backend=backend)
+                return _encoder
+            except Exception as e:
+                logger.warning("Embedding backend %s unavailable, using torch: %s", backend, e)
         _encoder = SentenceTransformer(settings.embedding_model)
     return _encoder
 
 
 async def embed_text(text: str) -> list[float]:
+    cached = _query_cache.get(text)
+    if cached is not None:
+        _query_cache.move_to_end(text)
+        return list(cached)
+
+    task = _inflight.get(text)
+    if task is None:
+        task = asyncio.ensure_future(_embed_text_uncached(text))
+        _inflight[text] = task
+        task.add_done_callback(lambda _: _inflight.pop(text, None))
+    # Copies, so a caller normalising its vector in place can't corrupt the cache.
+    return list(await asyncio.shield(task))
+
+
+async def _embed_text_uncached(text: str) -> list[float]:
     if settings.embedding_provider == "local":
-        return _embed_local(text)
+        vec = await asyncio.to_thread(_embed_local, text)
     elif settings.embedding_provider == "openai":
-        return await _embed_openai(text)
-    raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
+        vec = await _embed_openai(text)
+    else:
+        raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
+
+    _query_cache[text] = vec
+    if len(_query_cache) > _QUERY_CACHE_SIZE:
+        _query_cache.popitem(last=False)
+    return vec
+
+
+async def embed_queries(texts: list[str]) -> list[list[float]]:
+    """Embed several query strings in one batch, sharing embed_text's cache."""
+    found = {t: _query_cache[t] for t in texts if t in _query_cache}
+    missing = [t for t in dict.fromkeys(texts) if t not in found]
+    if missing:
+        for t, vec in zip(missing, await embed_batch(missing)):
+            found[t] = vec
+            _query_cache[t] = vec
+        while len(_query_cache) > _QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    return [list(found[t]) for t in texts]
 
 
 async def embed_batch(texts: list[str]) -> list[list[float]]:
     if not texts:
         return []
+    # Crawled pages repeat boilerplate chunks; encode each distinct text once.
+    unique = list(dict.fromkeys(texts))
     if settings.embedding_provider == "local":
-        return _embed_local_batch(texts)
+        vecs = await asyncio.to_thread(_embed_local_batch, unique)
     elif settings.embedding_provider == "openai":
-        return await _embed_openai_batch(texts)
-    raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
+        vecs = await _embed_openai_batch(unique)
+    else:
+        raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
+    if len(unique) == len(texts):
+        return vecs
+    by_text = dict(zip(unique, vecs))
+    return [by_text[t] for t in texts]
 
 
 def _embed_local(text: str) -> list[float]:
@@ -48,8 +110,6 @@ async def _embed_openai(text: str) -> list[float]:
 
 
 async def _embed_openai_batch(texts: list[str]) -> list[list[float]]:
-    import httpx
-
     api_key = settings.openai_api_key or settings.openrouter_api_key
     if not api_key:
         raise ValueError("No API key for OpenAI-compatible embedding")
@@ -57,13 +117,14 @@ async def _embed_openai_batch(texts: list[str]) -> list[list[float]]:
     base = settings.openai_base_url or "https://api.openai.com/v1"
     model = settings.openai_embedding_model or "text-embedding-3-small"
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            f"{base}/embeddings",
-            headers={"Authorization": f"Bearer {api_key}"},
-            json={"input": texts, "model": model},
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        sorted_data = sorted(data["data"], key=lambda x: x["index"])
-        return [item["embedding"] for item in sorted_data]
+    client = get_http_client()
+    resp = await client.post(
+        f"{base}/embeddings",
+        headers={"Authorization": f"Bearer {api_key}"},
+        json={"input": texts, "model": model},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    data = json_fast.loads(resp.content)
+    sorted_data = sorted(data["data"], key=lambda x: x["index"])
+    return [item["embedding"] for item in sorted_data]
@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
-import re
 import time
 from typing import Any, AsyncIterator, Callable
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
-from .llm import call_llm as _call_llm, track_token_usage, LLMError
+from ..config import settings
+from .json_fast import JSONDecodeError, extract_json
+from .llm import call_llm as _call_llm, record_token_usage, LLMError
 from .types import GenerateResult, UsageInfo
+from .prompts import FAITHFULNESS_PROMPT, REFLEXION_PROMPT
+from .token_budget import check_token_budget, count_tokens, shrink_context
 from .providers import registry as _provider_registry, LLMProviderService, _estimate_tokens
 
 logger = logging.getLogger(__name__)
@@ -41,7 +43,7 @@ class BaseGenerator:
         messages: list[dict] | None = None,
     ) -> list[dict]:
         if messages is not None:
-            return messages
+            return self._window_messages(messages)
         if system_prompt is not None and user_prompt is not None:
             return [
                 {"role": "system", "content": system_prompt},
@@ -55,6 +57,23 @@ class BaseGenerator:
             return [{"role": "user", "content": prompt}]
         return []
 
+    def _window_messages(self, messages: list[dict]) -> list[dict]:
+        """Cap chat history at settings.max_context_messages turns.
+
+        System messages and the opening turn are always kept; the oldest
+        turns after it are dropped so prompt size stays flat as chats grow.
+        """
+        limit = settings.max_context_messages
+        turn_idx = [i for i, m in enumerate(messages) if m.get("role") != "system"]
+        if limit <= 0 or len(turn_idx) <= limit:
+            return messages
+        if limit > 1:
+            dropped = set(turn_idx[1:len(turn_idx) - limit + 1])
+        else:
+            dropped = set(turn_idx[:-1])
+        logger.debug("Dropping %d old chat turns (limit %d)", len(dropped), limit)
+        return [m for i, m in enumerate(messages) if i not in dropped]
+
     def _to_langchain_messages(self, msgs: list[dict]) -> list:
         lc_msgs = []
         for m in msgs:
@@ -78,11 +97,7 @@ class BaseGenerator:
         agent_name: str | None = None,
         db=None,
     ) -> GenerateResult:
-        from .token_budget import check_token_budget, shrink_context, count_tokens
-
         msgs = self._build_messages(prompt, system_prompt, user_prompt, messages)
-        prompt_text = " ".join(m.get("content", "") for m in msgs)
-        prompt_tokens = count_tokens(prompt_text)
 
         last_error = None
         providers = _provider_registry.get_providers()
@@ -97,23 +112,23 @@ class BaseGenerator:
                     start = time.monotonic()
                     result = provider.generate(msgs, temperature, max_tokens)
                     result.usage.duration_ms = int((time.monotonic() - start) * 1000)
-                    asyncio.create_task(track_token_usage(
+                    record_token_usage(
                         session_id=session_id,
                         provider=provider.name,
                         model=provider.model_name,
-                        prompt_tokens=prompt_tokens,
+                        prompt_tokens=result.usage.prompt_tokens,
                         completion_tokens=result.usage.completion_tokens,
                         duration_ms=result.usage.duration_ms,
                         agent_name=agent_name,
                         db=db,
-                    ))
+                    )
                     return result
                 except Exception as e:
                     last_error = e
                     continue
             if attempt == 0:
                 logger.warning("All providers failed on first attempt, shrinking context and retrying")
-                msgs = shrink_context(msgs, max_context=3000)
+                msgs = shrink_context(msgs, budget=3000)
                 continue
             break
 
@@ -132,8 +147,6 @@ class BaseGenerator:
         agent_name: str | None = None,
         db=None,
     ) -> GenerateResult:
-        from .token_budget import check_token_budget, shrink_context, count_tokens
-
         msgs = self._build_messages(prompt, system_prompt, user_prompt, messages)
         prompt_text = " ".join(m.get("content", "") for m in msgs)
         prompt_tokens = count_tokens(prompt_text)
@@ -141,6 +154,7 @@ class BaseGenerator:
         last_error = None
         providers = _provider_registry.get_providers()
         budget_applied = False
+        callback_is_async = asyncio.iscoroutinefunction(token_callback)
 
         for attempt in range(2):
             for provider in providers:
@@ -149,15 +163,16 @@ class BaseGenerator:
                         msgs = check_token_budget(msgs)
                         budget_applied = True
                     start = time.monotonic()
-                    full_response = ""
+                    parts: list[str] = []
                     async for token in provider.generate_stream(msgs, temperature, max_tokens):
                         if token:
-                            full_response += token
+                            parts.append(token)
                             if token_callback:
-                                if asyncio.iscoroutinefunction(token_callback):
+                                if callback_is_async:
                                     await token_callback(token)
                                 else:
                                     token_callback(token)
+                    full_response = "".join(parts)
                     duration_ms = int((time.monotonic() - start) * 1000)
                     completion_tokens = count_tokens(full_response)
                     usage = UsageInfo(
@@ -167,7 +182,7 @@ class BaseGenerator:
                         completion_tokens=completion_tokens,
                         duration_ms=duration_ms,
                     )
-                    asyncio.create_task(track_token_usage(
+                    record_token_usage(
                         session_id=session_id,
                         provider=provider.name,
                         model=provider.model_name,
@@ -176,14 +191,14 @@ class BaseGenerator:
                         duration_ms=duration_ms,
                         agent_name=agent_name,
                         db=db,
-                    ))
+                    )
                     return GenerateResult(content=full_response, usage=usage)
                 except Exception as e:
                     last_error = e
                     continue
             if attempt == 0:
                 logger.warning("All providers failed on first streaming attempt, shrinking context and retrying")
-                msgs = shrink_context(msgs, max_context=3000)
+                msgs = shrink_context(msgs, budget=3000)
                 continue
             break
 
@@ -335,26 +350,19 @@ def _faithfulness_check(answer: str, context: str) -> dict:
     if not context.strip():
         return {"faithful": True, "unsupported_claims": [], "score": 10}
     result = _call_llm(
-        "You are a faithfulness verifier. Given an answer and the source context, "
-        "identify any claims in the answer that are NOT supported by the context. "
-        "Return JSON: {\"faithful\": true/false, \"unsupported_claims\": [\"...\"], \"score\": 0-10}",
+        FAITHFULNESS_PROMPT,
         f"Context:\n{context}\n\nAnswer:\n{answer}\n\nVerification:",
         temperature=0.1,
     )
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        return {"faithful": True, "unsupported_claims": [], "score": 10}
-    except (json.JSONDecodeError, AttributeError):
+        return extract_json(result)
+    except (JSONDecodeError, AttributeError):
         return {"faithful": True, "unsupported_claims": [], "score": 10}
 
 
 def _reflexion_revise(answer: str, context: str, unsupported_claims: list[str]) -> str:
     revised = _call_llm(
-        "You are a research assistant. Your previous answer contained unsupported claims. "
-        "Revise it to ONLY include information supported by the provided context. "
-        "If the context doesn't fully answer the question, say so explicitly.",
+        REFLEXION_PROMPT,
         f"Context:\n{context}\n\nPrevious Answer:\n{answer}\n\n"
         f"Unsupported Claims:\n{chr(10).join(unsupported_claims)}\n\nRevised Answer:",
         temperature=0.2,
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = weakref.WeakKeyDictionary()
+_sync_client: httpx.Client | None = None
+_sync_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Pooled async client for the running event loop.
+
+    An AsyncClient's connections belong to the loop they were opened on, so
+    each loop (the server's, a test client's, asyncio.run in a worker) gets
+    its own. Timeouts and redirect handling are passed per request by the
+    callers.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(limits=_LIMITS)
+    return client
+
+
+def get_sync_http_client() -> httpx.Client:
+    """Pooled client for the blocking LLM calls, which may run on worker threads."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        with _sync_lock:
+            if _sync_client is None or _sync_client.is_closed:
+                _sync_client = httpx.Client(limits=_LIMITS)
+    return _sync_client
+
+
+async def close_http_client() -> None:
+    """Close the running loop's async client and the shared sync client."""
+    global _sync_client
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
@@ -0,0 +1,88 @@
+"""Fast JSON helpers — orjson when installed, stdlib json otherwise."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+try:
+    import orjson
+
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    _ORJSON_AVAILABLE = False
+
+JSONDecodeError = json.JSONDecodeError
+
+_CLOSERS = {"{": "}", "[": "]"}
+_JSON_SIGNIFICANT_RE = re.compile(r'["\\{}\[\]]')
+
+
+def dumps(obj: Any) -> str:
+    """Serialize to a compact JSON string."""
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse JSON text. Raises JSONDecodeError on invalid input."""
+    if _ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _find_json_span(text: str, opener: str) -> tuple[int, int] | None:
+    """Locate the first balanced object/array starting at ``opener``.
+
+    Linear scan over the structural characters only; braces inside string
+    literals are ignored.
+    """
+    closer = _CLOSERS[opener]
+    start = text.find(opener)
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped_pos = -1
+    for m in _JSON_SIGNIFICANT_RE.finditer(text, start):
+        ch = m.group()
+        pos = m.start()
+        if in_string:
+            if pos == escaped_pos:
+                continue
+            if ch == "\\":
+                escaped_pos = pos + 1
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == opener:
+            depth += 1
+        elif ch == closer:
+            depth -= 1
+            if depth == 0:
+                return start, pos + 1
+    return None
+
+
+def extract_json(text: str, opener: str = "{") -> Any:
+    """Parse the first JSON object (or array, with ``opener="["``) in LLM output.
+
+    Raises JSONDecodeError when no balanced span is found or it fails to parse.
+    """
+    stripped = text.strip()
+    if stripped[:1] == opener:
+        try:
+            return loads(stripped)
+        except JSONDecodeError:
+            pass
+
+    span = _find_json_span(text, opener)
+    if span is None:
+        raise JSONDecodeError("No JSON found", text, 0)
+    return loads(text[span[0]:span[1]])
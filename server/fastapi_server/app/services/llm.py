@@ -1,12 +1,23 @@
 import asyncio
 import time
 import logging
-import httpx
-from langchain_groq import ChatGroq
+import weakref
+from typing import ClassVar
+
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.outputs import ChatResult, ChatGeneration
 from ..config import settings
+from ..db import TokenUsage
+from . import json_fast
+from .http import get_http_client, get_sync_http_client
+from .token_budget import (
+    USER_PROMPT_TOKENS,
+    count_prompt_tokens,
+    count_tokens,
+    is_static_prompt,
+    truncate_to_token_budget,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +33,89 @@ class LLMError(Exception):
         super().__init__(message)
 
 
+class _OpenAICompatibleLLM(BaseChatModel):
+    """Minimal chat model for OpenAI-compatible completion endpoints."""
+
+    api_key: str
+    model: str
+    temperature: float = 0.7
+    max_tokens: int = 4096
+    timeout: int = 60
+
+    endpoint: ClassVar[str] = ""
+
+    def _payload(self, messages, stop) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": [{"role": m.type, "content": m.content} for m in messages],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    @staticmethod
+    def _to_result(resp) -> ChatResult:
+        resp.raise_for_status()
+        data = json_fast.loads(resp.content)
+        content = data["choices"][0]["message"]["content"]
+        return ChatResult(generations=[ChatGeneration(message=HumanMessage(content=content))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        resp = get_sync_http_client().post(
+            self.endpoint,
+            headers=self._headers(),
+            json=self._payload(messages, stop),
+            timeout=self.timeout,
+        )
+        return self._to_result(resp)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Without this, ainvoke falls back to running _generate in an executor.
+        resp = await get_http_client().post(
+            self.endpoint,
+            headers=self._headers(),
+            json=self._payload(messages, stop),
+            timeout=self.timeout,
+        )
+        return self._to_result(resp)
+
+
+class CerebrasLLM(_OpenAICompatibleLLM):
+    endpoint: ClassVar[str] = "https://api.cerebras.ai/v1/chat/completions"
+
+    def _payload(self, messages, stop) -> dict:
+        payload = super()._payload(messages, stop)
+        payload["max_completion_tokens"] = payload.pop("max_tokens")
+        payload["top_p"] = 1
+        return payload
+
+    @property
+    def _llm_type(self):
+        return "cerebras"
+
+
+class OpenRouterLLM(_OpenAICompatibleLLM):
+    endpoint: ClassVar[str] = "https://openrouter.ai/api/v1/chat/completions"
+
+    @property
+    def _llm_type(self):
+        return "openrouter"
+
+
 def _build_groq_llm(temperature: float, max_tokens: int) -> BaseChatModel | None:
     if not settings.groq_api_key:
         return None
     try:
+        from langchain_groq import ChatGroq
+
         return ChatGroq(
             api_key=settings.groq_api_key,
             model=settings.groq_model,
@@ -42,43 +132,6 @@ def _build_cerebras_llm(temperature: float, max_tokens: int) -> BaseChatModel |
     if not settings.cerebras_api_key:
         return None
     try:
-
-        class CerebrasLLM(BaseChatModel):
-            api_key: str
-            model: str
-            temperature: float = 0.7
-            max_tokens: int = 4096
-            timeout: int = 60
-
-            def _generate(self, messages, stop=None, run_manager=None, **kwargs):
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                }
-                payload = {
-                    "model": self.model,
-                    "messages": [{"role": m.type, "content": m.content} for m in messages],
-                    "max_completion_tokens": self.max_tokens,
-                    "temperature": self.temperature,
-                    "top_p": 1,
-                }
-                if stop:
-                    payload["stop"] = stop
-                resp = httpx.post(
-                    "https://api.cerebras.ai/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=self.timeout,
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                content = data["choices"][0]["message"]["content"]
-                return ChatResult(generations=[ChatGeneration(message=HumanMessage(content=content))])
-
-            @property
-            def _llm_type(self):
-                return "cerebras"
-
         return CerebrasLLM(
             api_key=settings.cerebras_api_key,
             model=settings.cerebras_model,
@@ -95,42 +148,6 @@ def _build_openrouter_llm(temperature: float, max_tokens: int) -> BaseChatModel
     if not settings.openrouter_api_key:
         return None
     try:
-
-        class OpenRouterLLM(BaseChatModel):
-            api_key: str
-            model: str
-            temperature: float = 0.7
-            max_tokens: int = 4096
-            timeout: int = 60
-
-            def _generate(self, messages, stop=None, run_manager=None, **kwargs):
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                }
-                payload = {
-                    "model": self.model,
-                    "messages": [{"role": m.type, "content": m.content} for m in messages],
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens,
-                }
-                if stop:
-                    payload["stop"] = stop
-                resp = httpx.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=self.timeout,
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                content = data["choices"][0]["message"]["content"]
-                return ChatResult(generations=[ChatGeneration(message=HumanMessage(content=content))])
-
-            @property
-            def _llm_type(self):
-                return "openrouter"
-
         return OpenRouterLLM(
             api_key=settings.openrouter_api_key,
             model=settings.openrouter_model,
@@ -155,7 +172,7 @@ def _try_providers(temperature: float, max_tokens: int) -> tuple[str, BaseChatMo
     for name, builder in _PROVIDERS:
         llm = builder(temperature, max_tokens)
         if llm is not None:
-            logger.info("Using LLM provider: %s", name)
+            logger.debug("Using LLM provider: %s", name)
             return name, llm
         errors.append(name)
     logger.error("All providers failed to initialize: %s", ", ".join(errors))
@@ -174,7 +191,6 @@ async def track_token_usage(
 ):
     if not session_id or db is None:
         return
-    from ..db import TokenUsage
     try:
         usage = TokenUsage(
             session_id=session_id,
@@ -192,6 +208,63 @@ async def track_token_usage(
         logger.warning("Failed to track token usage: %s", e)
 
 
+_background_tasks: set[asyncio.Task] = set()
+
+
+def record_token_usage(**kwargs) -> None:
+    """Schedule track_token_usage off the caller's path.
+
+    Skipped when there is nothing to record or no running loop; a reference
+    is kept until the write finishes so the task is not garbage-collected.
+    """
+    if not kwargs.get("session_id") or kwargs.get("db") is None:
+        return
+    try:
+        task = asyncio.get_running_loop().create_task(track_token_usage(**kwargs))
+    except RuntimeError:
+        return
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+_llm_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _llm_slot(provider: str) -> asyncio.Semaphore:
+    """Per-provider cap on in-flight async calls.
+
+    Fan-out callers queue here instead of bursting past the provider's rate
+    limit and sitting in 429 backoff. Semaphores bind to the loop they are
+    first awaited on, so each event loop gets its own set, dropped with it.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _llm_semaphores.get(loop)
+    if slots is None:
+        slots = _llm_semaphores[loop] = {}
+    sem = slots.get(provider)
+    if sem is None:
+        sem = slots[provider] = asyncio.Semaphore(settings.llm_max_concurrency)
+    return sem
+
+
+_static_system_messages: dict[str, SystemMessage] = {}
+
+
+def _system_message(content: str) -> SystemMessage:
+    """Build each registered static system prompt's message once.
+
+    Caller-supplied prompts get a fresh message and are never cached.
+    """
+    message = _static_system_messages.get(content)
+    if message is None:
+        message = SystemMessage(content=content)
+        if is_static_prompt(content):
+            _static_system_messages[content] = message
+    return message
+
+
 def get_llm(temperature: float = 0.7, max_tokens: int = 4096) -> BaseChatModel:
     _, llm = _try_providers(temperature, max_tokens)
     return llm
@@ -205,26 +278,20 @@ def call_llm(
     agent_name: str | None = None,
     db=None,
 ) -> str:
-    from .token_budget import count_tokens, truncate_to_token_budget
-
     last_error = None
-    budget_ctx = 3500
-    user_prompt = truncate_to_token_budget(user_prompt, budget_ctx)
-    prompt_tokens = count_tokens(system_prompt) + count_tokens(user_prompt)
+    user_prompt = truncate_to_token_budget(user_prompt, USER_PROMPT_TOKENS)
+    prompt_tokens = count_prompt_tokens(system_prompt) + count_tokens(user_prompt)
+    messages = [_system_message(system_prompt), HumanMessage(content=user_prompt)]
     for name, builder in _PROVIDERS:
         llm = builder(temperature, max_tokens=4096)
         if llm is None:
             continue
         try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt),
-            ]
             start = time.monotonic()
             response = llm.invoke(messages)
             duration_ms = int((time.monotonic() - start) * 1000)
             completion_tokens = count_tokens(response.content)
-            asyncio.create_task(track_token_usage(
+            record_token_usage(
                 session_id=session_id,
                 provider=name,
                 model=getattr(llm, 'model', str(type(llm).__name__)),
@@ -233,7 +300,48 @@ def call_llm(
                 duration_ms=duration_ms,
                 agent_name=agent_name,
                 db=db,
-            ))
+            )
+            return response.content
+        except Exception as e:
+            logger.warning("LLM provider %s failed: %s", name, e)
+            last_error = e
+    logger.error("All LLM providers exhausted")
+    raise LLMError() from last_error
+
+
+async def acall_llm(
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float = 0.7,
+    session_id: str | None = None,
+    agent_name: str | None = None,
+    db=None,
+) -> str:
+    """Async call_llm: awaits ainvoke so the event loop is not blocked."""
+    last_error = None
+    user_prompt = truncate_to_token_budget(user_prompt, USER_PROMPT_TOKENS)
+    prompt_tokens = count_prompt_tokens(system_prompt) + count_tokens(user_prompt)
+    messages = [_system_message(system_prompt), HumanMessage(content=user_prompt)]
+    for name, builder in _PROVIDERS:
+        llm = builder(temperature, max_tokens=4096)
+        if llm is None:
+            continue
+        try:
+            start = time.monotonic()
+            async with _llm_slot(name):
+                response = await llm.ainvoke(messages)
+            duration_ms = int((time.monotonic() - start) * 1000)
+            completion_tokens = count_tokens(response.content)
+            record_token_usage(
+                session_id=session_id,
+                provider=name,
+                model=getattr(llm, 'model', str(type(llm).__name__)),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                duration_ms=duration_ms,
+                agent_name=agent_name,
+                db=db,
+            )
             return response.content
         except Exception as e:
             logger.warning("LLM provider %s failed: %s", name, e)
@@ -251,32 +359,28 @@ async def call_llm_stream(
     agent_name: str | None = None,
     db=None,
 ) -> str:
-    from .token_budget import count_tokens, truncate_to_token_budget
-
     last_error = None
-    budget_ctx = 3500
-    user_prompt = truncate_to_token_budget(user_prompt, budget_ctx)
-    prompt_tokens = count_tokens(system_prompt) + count_tokens(user_prompt)
+    user_prompt = truncate_to_token_budget(user_prompt, USER_PROMPT_TOKENS)
+    prompt_tokens = count_prompt_tokens(system_prompt) + count_tokens(user_prompt)
+    messages = [_system_message(system_prompt), HumanMessage(content=user_prompt)]
     for name, builder in _PROVIDERS:
         llm = builder(temperature, max_tokens=4096)
         if llm is None:
             continue
         try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt),
-            ]
             start = time.monotonic()
-            full_response = ""
-            async for chunk in llm.astream(messages):
-                token = chunk.content
-                if token:
-                    full_response += token
-                    if token_callback:
-                        await token_callback(token)
+            parts: list[str] = []
+            async with _llm_slot(name):
+                async for chunk in llm.astream(messages):
+                    token = chunk.content
+                    if token:
+                        parts.append(token)
+                        if token_callback:
+                            await token_callback(token)
+            full_response = "".join(parts)
             duration_ms = int((time.monotonic() - start) * 1000)
             completion_tokens = count_tokens(full_response)
-            asyncio.create_task(track_token_usage(
+            record_token_usage(
                 session_id=session_id,
                 provider=name,
                 model=getattr(llm, 'model', str(type(llm).__name__)),
@@ -285,7 +389,7 @@ async def call_llm_stream(
                 duration_ms=duration_ms,
                 agent_name=agent_name,
                 db=db,
-            ))
+            )
             return full_response
         except Exception as e:
             logger.warning("LLM provider %s stream failed: %s", name, e)
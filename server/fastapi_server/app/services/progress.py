@@ -1,5 +1,7 @@
-import json
 import os
+import time
+
+from .json_fast import dumps
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
@@ -17,7 +19,7 @@ def get_producer():
 async def emit_progress(job_id: str, agent: str, status: str, message: str = "", data: dict | None = None):
     try:
         r = get_producer()
-        payload = json.dumps({
+        payload = dumps({
             "jobId": job_id,
             "agent": agent,
             "status": status,
@@ -37,6 +39,37 @@ async def emit_token(job_id: str, token: str):
         pass
 
 
+class TokenBuffer:
+    """Coalesces streamed tokens into fewer Redis publishes.
+
+    Flushes once ``max_chars`` have accumulated or ``max_delay`` seconds have
+    passed since the last publish; call ``flush()`` when the stream ends.
+    """
+
+    def __init__(self, job_id: str, max_chars: int = 64, max_delay: float = 0.05):
+        self.job_id = job_id
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self._parts: list[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    async def add(self, token: str):
+        self._parts.append(token)
+        self._size += len(token)
+        if self._size >= self.max_chars or time.monotonic() - self._last_flush >= self.max_delay:
+            await self.flush()
+
+    async def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._parts:
+            return
+        chunk = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        await emit_token(self.job_id, chunk)
+
+
 async def is_job_cancelled(job_id: str) -> bool:
     """Check if a research job has been cancelled via Redis flag."""
     try:
@@ -53,7 +86,7 @@ async def cancel_job(job_id: str):
         r = get_producer()
         await r.set(f"research:cancel:{job_id}", "1")
         # Publish a cancellation event so SSE picks it up
-        payload = json.dumps({
+        payload = dumps({
             "jobId": job_id,
             "agent": "pipeline",
             "status": "cancelled",
@@ -0,0 +1,59 @@
+"""System prompts shared by the RAG helpers, the generator and /api/ai.
+
+Kept as single constants so every caller sends a byte-identical system
+message; providers that cache prompt prefixes can then reuse it.
+"""
+
+from .token_budget import register_static_prompts
+
+REWRITE_QUERY_PROMPT = (
+    "You rewrite user questions into precise, self-contained search queries for a RAG system. "
+    "Remove ambiguity, add technical terms, keep it a single sentence."
+)
+
+SUB_QUESTIONS_PROMPT = (
+    "Break the following research question into 2-3 specific sub-questions. "
+    "Return as a JSON list of strings only. Example: [\"sub question 1\", \"sub question 2\"]"
+)
+
+REWRITE_AND_SUB_QUESTIONS_PROMPT = (
+    "You prepare research questions for a RAG system. Rewrite the question into one precise, "
+    "self-contained search query (remove ambiguity, add technical terms), then break it into "
+    "2-3 specific sub-questions. Return JSON only: "
+    "{\"rewritten\": \"...\", \"sub_questions\": [\"...\", \"...\"]}"
+)
+
+CONTEXT_COMPRESS_PROMPT = (
+    "You are a context compression system. Extract ONLY the sentences and facts "
+    "from the provided context that are directly relevant to answering the question. "
+    "Remove irrelevant information. Preserve exact wording of relevant sentences. "
+    "Keep all technical terms, numbers, and proper names intact."
+)
+
+FAITHFULNESS_PROMPT = (
+    "You are a faithfulness verifier. Given an answer and the source context, "
+    "identify any claims in the answer that are NOT supported by the context. "
+    "Return JSON: {\"faithful\": true/false, \"unsupported_claims\": [\"...\"], \"score\": 0-10}"
+)
+
+REFLEXION_PROMPT = (
+    "You are a research assistant. Your previous answer contained unsupported claims. "
+    "Revise it to ONLY include information supported by the provided context. "
+    "If the context doesn't fully answer the question, say so explicitly."
+)
+
+REFLEXION_CITED_PROMPT = (
+    "You are a research assistant. Your previous answer contained unsupported claims. "
+    "Revise it to ONLY include information supported by the provided context. "
+    "Cite section names. If the context doesn't fully answer the question, say so explicitly."
+)
+
+register_static_prompts(
+    REWRITE_QUERY_PROMPT,
+    SUB_QUESTIONS_PROMPT,
+    REWRITE_AND_SUB_QUESTIONS_PROMPT,
+    CONTEXT_COMPRESS_PROMPT,
+    FAITHFULNESS_PROMPT,
+    REFLEXION_PROMPT,
+    REFLEXION_CITED_PROMPT,
+)
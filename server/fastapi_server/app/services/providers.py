@@ -10,10 +10,11 @@ from typing import AsyncIterator
 import httpx
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.outputs import ChatResult, ChatGeneration
-from langchain_groq import ChatGroq
 
 from ..config import settings
+from . import json_fast
+from .http import get_http_client, get_sync_http_client
+from .token_budget import check_token_budget, count_tokens, shrink_context
 from .types import GenerateResult, UsageInfo
 
 logger = logging.getLogger(__name__)
@@ -25,7 +26,7 @@ USER_FRIENDLY_ERROR = (
 
 
 def _estimate_tokens(text: str) -> int:
-    return max(1, len(text) // 4)
+    return max(1, count_tokens(text))
 
 
 class LLMProviderError(Exception):
@@ -46,6 +47,29 @@ def _to_langchain_messages(msgs: list[dict]) -> list:
     return lc_msgs
 
 
+async def _stream_chat_tokens(
+    url: str, headers: dict, payload: dict, timeout: int
+) -> AsyncIterator[str]:
+    """Yield content deltas from an OpenAI-compatible SSE completion stream."""
+    client = get_http_client()
+    async with client.stream("POST", url, headers=headers, json=payload, timeout=timeout) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data_str = line[6:]
+            if data_str.strip() == "[DONE]":
+                break
+            try:
+                data = json_fast.loads(data_str)
+                delta = data.get("choices", [{}])[0].get("delta", {})
+                token = delta.get("content", "")
+                if token:
+                    yield token
+            except json_fast.JSONDecodeError:
+                continue
+
+
 class LLMProviderService(abc.ABC):
     """Single internal abstraction for all LLM providers.
 
@@ -100,6 +124,8 @@ class GroqClient(LLMProviderService):
     def _build_llm(self, temperature: float, max_tokens: int) -> BaseChatModel:
         if not self._api_key:
             raise LLMProviderError("Groq API key not configured")
+        from langchain_groq import ChatGroq
+
         return ChatGroq(
             api_key=self._api_key,
             model=self._model,
@@ -114,8 +140,6 @@ class GroqClient(LLMProviderService):
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> GenerateResult:
-        from .token_budget import check_token_budget, shrink_context, count_tokens
-
         budgeted = check_token_budget(messages)
         prompt_tokens = count_tokens(" ".join(m.get("content", "") for m in budgeted))
 
@@ -128,7 +152,7 @@ class GroqClient(LLMProviderService):
             err_str = str(e)
             if "413" in err_str or "too large" in err_str.lower() or "rate_limit_exceeded" in err_str:
                 logger.warning("Groq 413 / token limit on %d-token prompt — shrinking further", prompt_tokens)
-                tighter = shrink_context(messages, max_context=3000)
+                tighter = shrink_context(messages, budget=3000)
                 tighter_tokens = count_tokens(" ".join(m.get("content", "") for m in tighter))
                 logger.info("Shrunk to %d tokens and retrying Groq", tighter_tokens)
                 llm = self._build_llm(temperature, max_tokens)
@@ -169,6 +193,8 @@ class OpenRouterClient(LLMProviderService):
     Uses an OpenAI-compatible chat completions endpoint.
     """
 
+    BASE_URL = "https://openrouter.ai/api/v1/chat/completions"
+
     def __init__(self):
         self._model: str = settings.openrouter_model
         self._api_key: str = settings.openrouter_api_key
@@ -182,13 +208,13 @@ class OpenRouterClient(LLMProviderService):
     def model_name(self) -> str:
         return self._model
 
-    def _chat_completion(
+    def _request(
         self,
         messages: list[dict],
-        temperature: float = 0.7,
-        max_tokens: int = 4096,
-        stream: bool = False,
-    ) -> httpx.Response:
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+    ) -> tuple[dict, dict]:
         if not self._api_key:
             raise LLMProviderError("OpenRouter API key not configured")
         headers = {
@@ -203,12 +229,16 @@ class OpenRouterClient(LLMProviderService):
         }
         if stream:
             payload["stream"] = True
-        resp = httpx.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=self._timeout,
-        )
+        return headers, payload
+
+    def _chat_completion(
+        self,
+        messages: list[dict],
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> httpx.Response:
+        headers, payload = self._request(messages, temperature, max_tokens, stream=False)
+        resp = get_sync_http_client().post(self.BASE_URL, headers=headers, json=payload, timeout=self._timeout)
         resp.raise_for_status()
         return resp
 
@@ -218,13 +248,16 @@ class OpenRouterClient(LLMProviderService):
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> GenerateResult:
-        prompt_tokens = _estimate_tokens(" ".join(m.get("content", "") for m in messages))
         start = time.monotonic()
-        resp = self._chat_completion(messages, temperature, max_tokens, stream=False)
+        resp = self._chat_completion(messages, temperature, max_tokens)
         duration_ms = int((time.monotonic() - start) * 1000)
-        data = resp.json()
+        data = json_fast.loads(resp.content)
         content = data["choices"][0]["message"]["content"]
-        completion_tokens = _estimate_tokens(content)
+        reported = data.get("usage") or {}
+        prompt_tokens = reported.get("prompt_tokens") or _estimate_tokens(
+            " ".join(m.get("content", "") for m in messages)
+        )
+        completion_tokens = reported.get("completion_tokens") or _estimate_tokens(content)
         usage = UsageInfo(
             provider=self.name,
             model=self._model,
@@ -240,23 +273,9 @@ class OpenRouterClient(LLMProviderService):
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> AsyncIterator[str]:
-        resp = self._chat_completion(messages, temperature, max_tokens, stream=True)
-        for line in resp.iter_lines():
-            if not line:
-                continue
-            if line.startswith("data: "):
-                data_str = line[6:]
-                if data_str.strip() == "[DONE]":
-                    break
-                try:
-                    import json
-                    data = json.loads(data_str)
-                    delta = data.get("choices", [{}])[0].get("delta", {})
-                    token = delta.get("content", "")
-                    if token:
-                        yield token
-                except json.JSONDecodeError:
-                    continue
+        headers, payload = self._request(messages, temperature, max_tokens, stream=True)
+        async for token in _stream_chat_tokens(self.BASE_URL, headers, payload, self._timeout):
+            yield token
 
 
 class CerebrasClient(LLMProviderService):
@@ -277,13 +296,13 @@ class CerebrasClient(LLMProviderService):
     def model_name(self) -> str:
         return self._model
 
-    def _chat_completion(
+    def _request(
         self,
         messages: list[dict],
-        temperature: float = 0.7,
-        max_tokens: int = 4096,
-        stream: bool = False,
-    ) -> httpx.Response:
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+    ) -> tuple[dict, dict]:
         if not self._api_key:
             raise LLMProviderError("Cerebras API key not configured")
         headers = {
@@ -300,12 +319,16 @@ class CerebrasClient(LLMProviderService):
         }
         if stream:
             payload["stream"] = True
-        resp = httpx.post(
-            self.BASE_URL,
-            headers=headers,
-            json=payload,
-            timeout=self._timeout,
-        )
+        return headers, payload
+
+    def _chat_completion(
+        self,
+        messages: list[dict],
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+    ) -> httpx.Response:
+        headers, payload = self._request(messages, temperature, max_tokens, stream=False)
+        resp = get_sync_http_client().post(self.BASE_URL, headers=headers, json=payload, timeout=self._timeout)
         resp.raise_for_status()
         return resp
 
@@ -315,13 +338,16 @@ class CerebrasClient(LLMProviderService):
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> GenerateResult:
-        prompt_tokens = _estimate_tokens(" ".join(m.get("content", "") for m in messages))
         start = time.monotonic()
-        resp = self._chat_completion(messages, temperature, max_tokens, stream=False)
+        resp = self._chat_completion(messages, temperature, max_tokens)
         duration_ms = int((time.monotonic() - start) * 1000)
-        data = resp.json()
+        data = json_fast.loads(resp.content)
         content = data["choices"][0]["message"]["content"]
-        completion_tokens = _estimate_tokens(content)
+        reported = data.get("usage") or {}
+        prompt_tokens = reported.get("prompt_tokens") or _estimate_tokens(
+            " ".join(m.get("content", "") for m in messages)
+        )
+        completion_tokens = reported.get("completion_tokens") or _estimate_tokens(content)
         usage = UsageInfo(
             provider=self.name,
             model=self._model,
@@ -337,23 +363,9 @@ class CerebrasClient(LLMProviderService):
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> AsyncIterator[str]:
-        resp = self._chat_completion(messages, temperature, max_tokens, stream=True)
-        for line in resp.iter_lines():
-            if not line:
-                continue
-            if line.startswith("data: "):
-                data_str = line[6:]
-                if data_str.strip() == "[DONE]":
-                    break
-                try:
-                    import json
-                    data = json.loads(data_str)
-                    delta = data.get("choices", [{}])[0].get("delta", {})
-                    token = delta.get("content", "")
-                    if token:
-                        yield token
-                except json.JSONDecodeError:
-                    continue
+        headers, payload = self._request(messages, temperature, max_tokens, stream=True)
+        async for token in _stream_chat_tokens(self.BASE_URL, headers, payload, self._timeout):
+            yield token
 
 
 class OpenAIClient(LLMProviderService):
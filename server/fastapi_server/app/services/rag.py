@@ -1,6 +1,8 @@
-import json
+import asyncio
+import heapq
 import re
 import logging
+from operator import itemgetter
 
 import numpy as np
 from sqlalchemy import select, text, and_
@@ -9,26 +11,59 @@ from pgvector.sqlalchemy import Vector
 
 from ..db import DocumentChunk
 from ..config import settings
-from .embeddings import embed_text
-from .llm import call_llm
+from .embeddings import embed_queries, embed_text
+from .json_fast import JSONDecodeError, extract_json
+from .llm import acall_llm
+from .token_budget import join_within_budget
+from .prompts import (
+    CONTEXT_COMPRESS_PROMPT,
+    FAITHFULNESS_PROMPT,
+    REFLEXION_CITED_PROMPT,
+    REWRITE_AND_SUB_QUESTIONS_PROMPT,
+    REWRITE_QUERY_PROMPT,
+    SUB_QUESTIONS_PROMPT,
+)
 
 logger = logging.getLogger(__name__)
 
+_CITATION_REF_RE = re.compile(r"\[(\d+)\]")
+
+NO_CONTEXT_ANSWER = "The research sources for this session don't contain information relevant to this question."
+
 _reranker = None
+_reranker_failed = False
 
 
 def _get_reranker():
-    global _reranker
-    if _reranker is None:
+    global _reranker, _reranker_failed
+    if _reranker is None and not _reranker_failed:
         try:
             from sentence_transformers import CrossEncoder
             _reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
             logger.info("Loaded reranker model: cross-encoder/ms-marco-MiniLM-L-6-v2")
-        except Exception:
-            _reranker = None
+            if settings.reranker_quantize:
+                _quantize_reranker(_reranker)
+        except Exception as e:
+            _reranker_failed = True
+            logger.warning("Reranker unavailable, falling back to retrieval scores: %s", e)
     return _reranker
 
 
+def _quantize_reranker(reranker) -> None:
+    """INT8 dynamic quantization of the reranker's Linear layers (CPU only)."""
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            return
+        reranker.model = torch.quantization.quantize_dynamic(
+            reranker.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        logger.info("Reranker quantized to INT8")
+    except Exception as e:
+        logger.warning("Reranker quantization failed, keeping FP32: %s", e)
+
+
 async def hybrid_search(
     query: str,
     session_id: str,
@@ -37,11 +72,13 @@ async def hybrid_search(
     min_score: float | None = None,
     source_type: str | None = None,
     min_trust_score: float | None = None,
+    query_vec: list[float] | None = None,
 ) -> list[dict]:
     top_k = top_k or settings.top_k_retrieval
     min_score = min_score or settings.min_retrieval_score
 
-    query_vec = await embed_text(query)
+    if query_vec is None:
+        query_vec = await embed_text(query)
 
     vector_results = await _vector_search(query_vec, session_id, db, top_k * 2)
     keyword_results = await _keyword_search(query, session_id, db, top_k * 2)
@@ -56,6 +93,8 @@ async def hybrid_search(
     if min_trust_score is not None:
         final = [r for r in final if (r.get("metadata", {}).get("trust_score") or 0) >= min_trust_score]
 
+    # Only the returned chunks need source scores.
+    final = final[:top_k]
     if final:
         chunk_ids = [r["id"] for r in final]
         scores = await fetch_source_scores(chunk_ids, session_id, db)
@@ -64,7 +103,7 @@ async def hybrid_search(
             if sid in scores:
                 r["source_scores"] = scores[sid]
 
-    return final[:top_k]
+    return final
 
 
 async def fetch_source_scores(chunk_ids: list[str], session_id: str, db: AsyncSession) -> dict:
@@ -82,48 +121,68 @@ async def fetch_source_scores(chunk_ids: list[str], session_id: str, db: AsyncSe
     return {str(r[0]): {"trust_score": float(r[1] or 0), "relevance_score": float(r[2] or 0), "freshness_score": float(r[3] or 0)} for r in rows}
 
 
-def rewrite_query(query: str) -> str:
-    result = call_llm(
-        "You rewrite user questions into precise, self-contained search queries for a RAG system. "
-        "Remove ambiguity, add technical terms, keep it a single sentence.",
+async def rewrite_query(query: str) -> str:
+    if not query.strip():
+        return query
+    result = await acall_llm(
+        REWRITE_QUERY_PROMPT,
         f"Original: {query}\n\nRewritten query:",
         temperature=0.2,
     )
     return result.strip()
 
 
-def sub_question_generation(query: str) -> list[str]:
-    result = call_llm(
-        "Break the following research question into 2-3 specific sub-questions. "
-        "Return as a JSON list of strings only. Example: [\"sub question 1\", \"sub question 2\"]",
+async def sub_question_generation(query: str) -> list[str]:
+    if not query.strip():
+        return []
+    result = await acall_llm(
+        SUB_QUESTIONS_PROMPT,
         f"Question: {query}\n\nSub-questions (JSON list):",
         temperature=0.2,
     )
     try:
-        json_match = re.search(r"\[.*?\]", result, re.DOTALL)
-        if json_match:
-            parsed = json.loads(json_match.group())
-            if parsed and isinstance(parsed, list) and isinstance(parsed[0], dict):
-                return [list(d.values())[0] for d in parsed]
-            return parsed
-        return [query]
-    except (json.JSONDecodeError, IndexError):
+        parsed = extract_json(result, "[")
+        if parsed and isinstance(parsed, list) and isinstance(parsed[0], dict):
+            return [list(d.values())[0] for d in parsed]
+        return parsed
+    except (JSONDecodeError, IndexError):
         return [query]
 
 
-def context_compress(chunks: list[dict], query: str, max_chars: int = 3000) -> str:
-    raw_ctx = "\n\n---\n\n".join(
-        f"[{r['section_title'] or 'Untitled'}] {r['chunk_text']}"
-        for r in chunks
+async def rewrite_and_decompose(query: str) -> tuple[str, list[str]]:
+    """rewrite_query and sub_question_generation in a single LLM round trip."""
+    if not query.strip():
+        return query, []
+    result = await acall_llm(
+        REWRITE_AND_SUB_QUESTIONS_PROMPT,
+        f"Question: {query}\n\nJSON:",
+        temperature=0.2,
+    )
+    try:
+        data = extract_json(result)
+    except JSONDecodeError:
+        return query, [query]
+    if not isinstance(data, dict):
+        return query, [query]
+    rewritten = data.get("rewritten")
+    if not isinstance(rewritten, str) or not rewritten.strip():
+        rewritten = query
+    sub_questions = data.get("sub_questions")
+    if not isinstance(sub_questions, list):
+        return rewritten.strip(), [query]
+    return rewritten.strip(), [q for q in sub_questions if isinstance(q, str) and q.strip()]
+
+
+async def context_compress(chunks: list[dict], query: str, max_chars: int = 3000) -> str:
+    raw_ctx = join_within_budget(
+        (f"[{r['section_title'] or 'Untitled'}] {r['chunk_text']}" for r in chunks),
+        "\n\n---\n\n",
     )
     if not raw_ctx.strip():
         return ""
 
-    compressed = call_llm(
-        "You are a context compression system. Extract ONLY the sentences and facts "
-        "from the provided context that are directly relevant to answering the question. "
-        "Remove irrelevant information. Preserve exact wording of relevant sentences. "
-        "Keep all technical terms, numbers, and proper names intact.",
+    compressed = await acall_llm(
+        CONTEXT_COMPRESS_PROMPT,
         f"Question: {query}\n\nContext:\n{raw_ctx}\n\nCompressed relevant context:",
         temperature=0.1,
     )
@@ -139,14 +198,15 @@ def validate_citations(text: str, source_count: int) -> tuple[str, list[str]]:
     citation numbers that exceed the available source count.
     """
     violations = []
-    refs = re.findall(r'\[(\d+)\]', text)
-    for ref in refs:
-        num = int(ref)
+
+    def _check(match: re.Match) -> str:
+        num = int(match.group(1))
         if num < 1 or num > source_count:
-            violations.append(ref)
-    if violations:
-        for v in violations:
-            text = text.replace(f"[{v}]", "")
+            violations.append(match.group(1))
+            return ""
+        return match.group()
+
+    text = _CITATION_REF_RE.sub(_check, text)
     return text, violations
 
 
@@ -157,51 +217,42 @@ async def enhanced_rag_search(
     top_k: int = 10,
     min_score: float = 0.2,
 ) -> str:
-    rewritten = rewrite_query(query)
-    sub_questions = sub_question_generation(rewritten)
+    rewritten, sub_questions = await rewrite_and_decompose(query)
 
-    all_chunks = []
-    seen_ids = set()
+    all_chunks: dict[str, dict] = {}
 
-    for q in [rewritten] + sub_questions:
-        results = await hybrid_search(q, session_id, db, top_k=top_k, min_score=min_score)
+    queries = [rewritten] + sub_questions
+    query_vecs = await embed_queries(queries)
+    for q, vec in zip(queries, query_vecs):
+        results = await hybrid_search(q, session_id, db, top_k=top_k, min_score=min_score, query_vec=vec)
         for r in results:
-            if r["id"] not in seen_ids:
-                seen_ids.add(r["id"])
-                all_chunks.append(r)
+            all_chunks.setdefault(r["id"], r)
 
-    all_chunks.sort(key=lambda x: x["score"], reverse=True)
-    compressed = context_compress(all_chunks[:15], rewritten)
+    top_chunks = heapq.nlargest(15, all_chunks.values(), key=itemgetter("score"))
+    compressed = await context_compress(top_chunks, rewritten)
     return compressed
 
 
-def faithfulness_check(answer: str, query: str, compressed_ctx: str) -> dict:
+async def faithfulness_check(answer: str, query: str, compressed_ctx: str) -> dict:
     if not compressed_ctx.strip():
         return {"faithful": True, "unsupported_claims": [], "score": 10}
 
-    result = call_llm(
-        "You are a faithfulness verifier. Given an answer and the source context, "
-        "identify any claims in the answer that are NOT supported by the context. "
-        "Return JSON: {\"faithful\": true/false, \"unsupported_claims\": [\"...\"], \"score\": 0-10}",
+    result = await acall_llm(
+        FAITHFULNESS_PROMPT,
         f"Context:\n{compressed_ctx}\n\nAnswer:\n{answer}\n\nVerification:",
         temperature=0.1,
     )
     try:
-        json_match = re.search(r"\{.*\}", result, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        return {"faithful": True, "unsupported_claims": [], "score": 10}
-    except (json.JSONDecodeError, AttributeError):
+        return extract_json(result)
+    except (JSONDecodeError, AttributeError):
         return {"faithful": True, "unsupported_claims": [], "score": 10}
 
 
-def reflexion_revise(
+async def reflexion_revise(
     answer: str, query: str, compressed_ctx: str, unsupported_claims: list[str]
 ) -> str:
-    revised = call_llm(
-        "You are a research assistant. Your previous answer contained unsupported claims. "
-        "Revise it to ONLY include information supported by the provided context. "
-        "Cite section names. If the context doesn't fully answer the question, say so explicitly.",
+    revised = await acall_llm(
+        REFLEXION_CITED_PROMPT,
         f"Question: {query}\n\nSupported Context:\n{compressed_ctx}\n\n"
         f"Previous Answer:\n{answer}\n\nUnsupported Claims:\n"
         f"{chr(10).join(unsupported_claims)}\n\nRevised Answer:",
@@ -245,25 +296,34 @@ async def rag_answer_with_verification(
     top_k: int = 10,
     min_score: float = 0.2,
 ) -> dict:
-    rewritten = rewrite_query(query)
-    sub_questions = sub_question_generation(rewritten)
+    rewritten, sub_questions = await rewrite_and_decompose(query)
 
-    all_chunks = []
-    seen_ids = set()
+    all_chunks: dict[str, dict] = {}
 
-    for q in [rewritten] + sub_questions:
-        results = await hybrid_search(q, session_id, db, top_k=top_k, min_score=min_score)
+    queries = [rewritten] + sub_questions
+    query_vecs = await embed_queries(queries)
+    for q, vec in zip(queries, query_vecs):
+        results = await hybrid_search(q, session_id, db, top_k=top_k, min_score=min_score, query_vec=vec)
         for r in results:
-            if r["id"] not in seen_ids:
-                seen_ids.add(r["id"])
-                all_chunks.append(r)
-
-    all_chunks.sort(key=lambda x: x["score"], reverse=True)
-    top_chunks = all_chunks[:15]
-
-    compressed_ctx = context_compress(top_chunks, rewritten)
+            all_chunks.setdefault(r["id"], r)
+
+    top_chunks = heapq.nlargest(15, all_chunks.values(), key=itemgetter("score"))
+    if not top_chunks:
+        logger.info("No chunks retrieved for session %s; skipping answer generation", session_id)
+        return {
+            "answer": NO_CONTEXT_ANSWER,
+            "faithful": True,
+            "faithfulness_score": 10,
+            "unsupported_claims": [],
+            "compressed_context_length": 0,
+            "citations": [],
+            "chunks_used": 0,
+        }
 
-    citations = await fetch_citations_for_chunks([c["id"] for c in top_chunks], session_id, db)
+    compressed_ctx, citations = await asyncio.gather(
+        context_compress(top_chunks, rewritten),
+        fetch_citations_for_chunks([c["id"] for c in top_chunks], session_id, db),
+    )
     citation_text = ""
     if citations:
         citation_lines = []
@@ -271,7 +331,7 @@ async def rag_answer_with_verification(
             citation_lines.append(f"[{c['citation_number']}] {c['claim_text'][:200]} — {c['url']}")
         citation_text = "\nCitations from source:\n" + "\n".join(citation_lines)
 
-    answer = call_llm(
+    answer = await acall_llm(
         "You are a research assistant. Answer based only on the context provided. "
         "Cite the section name and citation number for each claim. "
         "If the context doesn't contain the answer, say so.",
@@ -279,12 +339,12 @@ async def rag_answer_with_verification(
         temperature=0.3,
     )
 
-    verdict = faithfulness_check(answer, query, compressed_ctx)
+    verdict = await faithfulness_check(answer, query, compressed_ctx)
     unsupported = verdict.get("unsupported_claims", [])
 
     if not verdict.get("faithful", True) and unsupported:
-        answer = reflexion_revise(answer, query, compressed_ctx, unsupported)
-        final_verdict = faithfulness_check(answer, query, compressed_ctx)
+        answer = await reflexion_revise(answer, query, compressed_ctx, unsupported)
+        final_verdict = await faithfulness_check(answer, query, compressed_ctx)
     else:
         final_verdict = verdict
 
@@ -342,7 +402,7 @@ async def _keyword_search(
     db: AsyncSession,
     top_k: int,
 ) -> list[dict]:
-    tsquery = " & ".join(query.split()[:10])
+    tsquery = " & ".join(query.split(maxsplit=10)[:10])
     if not tsquery:
         return []
 
@@ -377,15 +437,17 @@ def _merge_results(
     keyword_results: list[dict],
     top_k: int,
 ) -> list[dict]:
-    seen_ids = set()
-    merged = []
-
-    for r in vector_results + keyword_results:
-        if r["id"] not in seen_ids:
-            seen_ids.add(r["id"])
-            merged.append(r)
+    limit = top_k * 2
+    merged: dict[str, dict] = {}
+    for results in (vector_results, keyword_results):
+        for r in results:
+            chunk_id = r.get("id")
+            if chunk_id and chunk_id not in merged:
+                merged[chunk_id] = r
+                if len(merged) >= limit:
+                    return list(merged.values())
 
-    return merged[:top_k * 2]
+    return list(merged.values())
 
 
 def _rerank(query: str, results: list[dict]) -> list[dict]:
@@ -3,23 +3,24 @@ import logging
 import re
 from urllib.parse import urlparse
 
-import httpx
 from bs4 import BeautifulSoup
 
 from ..config import settings
+from .http import get_http_client
 
 logger = logging.getLogger(__name__)
 
 MAX_TEXT_LENGTH = settings.web_chunk_size_chars * 4
+USER_AGENT = "KuchiBot/1.0 (research assistant)"
 
-JS_HEAVY_DOMAINS = {
+JS_HEAVY_DOMAINS = frozenset({
     "twitter.com", "x.com", "reddit.com", "www.reddit.com",
     "medium.com", "dev.to", "hashnode.com",
     "reactjs.org", "nextjs.org", "angular.io",
     "app.diagrams.net", "excalidraw.com",
     "observablehq.com", "codepen.io", "codesandbox.io",
     "stackblitz.com", "glitch.com",
-}
+})
 
 SPA_INDICATORS = [
     "__NEXT_DATA__", "__NUXT__", "__REACT_DEVTOOLS_GLOBAL_HOOK__",
@@ -28,6 +29,20 @@ SPA_INDICATORS = [
     "wp-block-library", "data-reactroot", "data-reactid",
     "router-link", "nuxt-config",
 ]
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_SPA_INDICATOR_RE = re.compile("|".join(map(re.escape, SPA_INDICATORS)))
+
+_playwright = None
+_browser = None
+_browser_lock = asyncio.Lock()
+
+
+def _collapse_blank_lines(text: str) -> str:
+    # Most extracted text has no 3+ newline runs, and a literal substring
+    # check finds that several times faster than the regex scan.
+    if "\n\n\n" not in text:
+        return text
+    return _BLANK_LINES_RE.sub("\n\n", text)
 
 
 def is_pdf_url(url: str) -> bool:
@@ -47,14 +62,15 @@ def needs_dynamic_scrape(url: str) -> bool:
 
 async def _detect_spa_with_head(url: str) -> bool:
     try:
-        async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
-            resp = await client.get(url, headers={"User-Agent": "KuchiBot/1.0 (research assistant)"})
-            text = resp.text[:50000]
-            for indicator in SPA_INDICATORS:
-                if indicator in text:
-                    logger.info("SPA indicator '%s' detected at %s", indicator, url)
-                    return True
-            return False
+        client = get_http_client()
+        resp = await client.get(
+            url, headers={"User-Agent": USER_AGENT}, timeout=10, follow_redirects=True
+        )
+        match = _SPA_INDICATOR_RE.search(resp.text, 0, 50000)
+        if match:
+            logger.debug("SPA indicator '%s' detected at %s", match.group(), url)
+            return True
+        return False
     except Exception:
         return False
 
@@ -63,9 +79,11 @@ async def scrape_url(url: str, timeout: int | None = None) -> dict | None:
     timeout = timeout or settings.web_crawl_timeout
     httpx_result: dict | None = None
     try:
-        async with httpx.AsyncClient(timeout=15, follow_redirects=True) as client:
-            head = await client.head(url, headers={"User-Agent": "KuchiBot/1.0 (research assistant)"})
-            ctype = head.headers.get("content-type", "").lower()
+        client = get_http_client()
+        head = await client.head(
+            url, headers={"User-Agent": USER_AGENT}, timeout=15, follow_redirects=True
+        )
+        ctype = head.headers.get("content-type", "").lower()
 
         if is_pdf_url(url) or "application/pdf" in ctype:
             return await _scrape_pdf(url, timeout)
@@ -87,9 +105,11 @@ async def scrape_url(url: str, timeout: int | None = None) -> dict | None:
 
 async def _scrape_httpx(url: str, timeout: int) -> dict | None:
     try:
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            resp = await client.get(url, headers={"User-Agent": "KuchiBot/1.0 (research assistant)"})
-            resp.raise_for_status()
+        client = get_http_client()
+        resp = await client.get(
+            url, headers={"User-Agent": USER_AGENT}, timeout=timeout, follow_redirects=True
+        )
+        resp.raise_for_status()
 
         content_type = resp.headers.get("content-type", "")
         if "application/pdf" in content_type:
@@ -105,7 +125,7 @@ async def _scrape_httpx(url: str, timeout: int) -> dict | None:
 
         title = soup.title.string.strip() if soup.title and soup.title.string else ""
         text = soup.get_text(separator="\n", strip=True)
-        text = re.sub(r"\n{3,}", "\n\n", text)
+        text = _collapse_blank_lines(text)
         text = text[:MAX_TEXT_LENGTH]
 
         return {"url": url, "title": title, "content": text, "source_type": "webpage"}
@@ -114,16 +134,42 @@ async def _scrape_httpx(url: str, timeout: int) -> dict | None:
         return None
 
 
+async def _get_browser():
+    """Long-lived headless Chromium shared by all dynamic scrapes.
+
+    Launching the browser costs seconds; each scrape opens its own context
+    instead, which is cheap and isolates cookies/storage between pages.
+    """
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            from playwright.async_api import async_playwright
+
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(headless=True)
+    return _browser
+
+
+async def close_browser() -> None:
+    global _playwright, _browser
+    if _browser is not None:
+        await _browser.close()
+        _browser = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
+
+
 async def _scrape_playwright(url: str, timeout: int) -> dict | None:
     try:
-        from playwright.async_api import async_playwright
-
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(headless=True)
-            page = await browser.new_page(
-                user_agent="KuchiBot/1.0 (research assistant)",
-                viewport={"width": 1280, "height": 800},
-            )
+        browser = await _get_browser()
+        context = await browser.new_context(
+            user_agent=USER_AGENT,
+            viewport={"width": 1280, "height": 800},
+        )
+        try:
+            page = await context.new_page()
             await page.goto(url, wait_until="networkidle", timeout=timeout * 1000)
             await asyncio.sleep(1)
 
@@ -137,7 +183,7 @@ async def _scrape_playwright(url: str, timeout: int) -> dict | None:
                     return clone.innerText;
                 }
             """)
-            text = re.sub(r"\n{3,}", "\n\n", content.strip())
+            text = _collapse_blank_lines(content.strip())
             text = text[:MAX_TEXT_LENGTH]
 
             result: dict = {
@@ -162,9 +208,9 @@ async def _scrape_playwright(url: str, timeout: int) -> dict | None:
             if images:
                 result["images"] = images
 
-            await browser.close()
-
             return result
+        finally:
+            await context.close()
     except Exception as e:
         logger.warning("Playwright scrape failed for %s: %s", url, e)
         return {"url": url, "title": "", "content": f"[Playwright scrape failed: {e}]", "source_type": "error"}
@@ -172,27 +218,33 @@ async def _scrape_playwright(url: str, timeout: int) -> dict | None:
 
 async def _scrape_pdf(url: str, timeout: int) -> dict | None:
     try:
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            resp = await client.get(url, headers={"User-Agent": "KuchiBot/1.0 (research assistant)"})
-            resp.raise_for_status()
+        client = get_http_client()
+        resp = await client.get(
+            url, headers={"User-Agent": USER_AGENT}, timeout=timeout, follow_redirects=True
+        )
+        resp.raise_for_status()
+
+        # PDF parsing is CPU-bound; keep it off the event loop so other
+        # crawls and requests proceed while it runs.
+        title, text = await asyncio.to_thread(_parse_pdf, resp.content)
+        return {"url": url, "title": title, "content": text, "source_type": "pdf"}
+    except Exception as e:
+        logger.warning("PDF scrape failed for %s: %s", url, e)
+        return {"url": url, "title": "", "content": f"[PDF scrape failed: {e}]", "source_type": "error"}
 
-        import fitz
 
-        pdf_data = resp.content
-        doc = fitz.open(stream=pdf_data, filetype="pdf")
+def _parse_pdf(pdf_data: bytes) -> tuple[str, str]:
+    import fitz
 
+    doc = fitz.open(stream=pdf_data, filetype="pdf")
+    try:
         title = doc.metadata.get("title", "") or ""
         text_parts = []
         for page_num in range(min(len(doc), 50)):
             page = doc[page_num]
             text_parts.append(page.get_text())
-
+    finally:
         doc.close()
-        text = "\n\n".join(text_parts)
-        text = re.sub(r"\n{3,}", "\n\n", text.strip())
-        text = text[:MAX_TEXT_LENGTH]
-
-        return {"url": url, "title": title, "content": text, "source_type": "pdf"}
-    except Exception as e:
-        logger.warning("PDF scrape failed for %s: %s", url, e)
-        return {"url": url, "title": "", "content": f"[PDF scrape failed: {e}]", "source_type": "error"}
+    text = "\n\n".join(text_parts)
+    text = _collapse_blank_lines(text.strip())
+    return title, text[:MAX_TEXT_LENGTH]
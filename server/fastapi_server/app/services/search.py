@@ -1,9 +1,13 @@
 import asyncio
+import time
+from collections import OrderedDict
 
-import httpx
 from exa_py import Exa
 
 from ..config import settings
+from . import json_fast
+from .http import get_http_client
+from .scraper import scrape_url
 
 _exa_client: Exa | None = None
 
@@ -15,10 +19,36 @@ def get_exa() -> Exa:
     return _exa_client
 
 
+_SEARCH_CACHE_SIZE = 256
+_search_cache: OrderedDict[tuple[str, str, int], tuple[float, list[dict]]] = OrderedDict()
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as the cache key."""
+    return " ".join(query.lower().split())
+
+
 async def search_web(query: str, max_results: int = None) -> list[dict]:
     provider = settings.web_search_provider
     max_results = max_results or settings.web_max_search_results
 
+    key = (provider, normalize_query(query), max_results)
+    hit = _search_cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < settings.web_search_cache_ttl:
+        _search_cache.move_to_end(key)
+        return [dict(r) for r in hit[1]]
+
+    results = await _search_provider(provider, query, max_results)
+    # Provider errors come back as a single url-less row; don't cache those.
+    if results and all(r.get("url") for r in results):
+        _search_cache[key] = (time.monotonic(), results)
+        _search_cache.move_to_end(key)
+        if len(_search_cache) > _SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+    return [dict(r) for r in results]
+
+
+async def _search_provider(provider: str, query: str, max_results: int) -> list[dict]:
     if provider == "exa" and settings.exa_api_key:
         return await _search_exa(query, max_results)
     elif provider == "tavily" and settings.tavily_api_key:
@@ -32,7 +62,8 @@ async def search_web(query: str, max_results: int = None) -> list[dict]:
 async def _search_exa(query: str, max_results: int) -> list[dict]:
     try:
         exa = get_exa()
-        results = exa.search(
+        results = await asyncio.to_thread(
+            exa.search,
             query,
             type="auto",
             num_results=max_results,
@@ -55,70 +86,74 @@ SEARCHSPACE_BASE = "https://q.searchspace.io"
 
 async def _search_searchspace(query: str, max_results: int) -> list[dict]:
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                f"{SEARCHSPACE_BASE}/v1/search",
-                headers={
-                    "authorization": f"Bearer {settings.searchspace_api_key}",
-                    "content-type": "application/json",
-                },
-                json={
-                    "query": query,
-                    "top_k": max_results,
-                    "contents": {
-                        "highlights": {"num_sentences": 2},
-                    },
+        client = get_http_client()
+        resp = await client.post(
+            f"{SEARCHSPACE_BASE}/v1/search",
+            headers={
+                "authorization": f"Bearer {settings.searchspace_api_key}",
+                "content-type": "application/json",
+            },
+            json={
+                "query": query,
+                "top_k": max_results,
+                "contents": {
+                    "highlights": {"num_sentences": 2},
                 },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            return [
-                {
-                    "title": r.get("title") or "",
-                    "url": r.get("url") or "",
-                    "snippet": (
-                        r["highlights"][0] if r.get("highlights") else r.get("snippet") or ""
-                    ),
-                }
-                for r in data.get("results", [])
-            ]
+            },
+            timeout=30,
+        )
+        resp.raise_for_status()
+        data = json_fast.loads(resp.content)
+        return [
+            {
+                "title": r.get("title") or "",
+                "url": r.get("url") or "",
+                "snippet": (
+                    r["highlights"][0] if r.get("highlights") else r.get("snippet") or ""
+                ),
+            }
+            for r in data.get("results", [])
+        ]
     except Exception as e:
         return [{"title": f"SearchSpace error: {e}", "url": "", "snippet": ""}]
 
 
 async def _search_tavily(query: str, max_results: int) -> list[dict]:
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post(
-            "https://api.tavily.com/search",
-            json={"api_key": settings.tavily_api_key, "query": query, "max_results": max_results},
-        )
-        data = resp.json()
-        return [
-            {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")}
-            for r in data.get("results", [])
-        ]
+    client = get_http_client()
+    resp = await client.post(
+        "https://api.tavily.com/search",
+        json={"api_key": settings.tavily_api_key, "query": query, "max_results": max_results},
+        timeout=30,
+    )
+    data = json_fast.loads(resp.content)
+    return [
+        {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")}
+        for r in data.get("results", [])
+    ]
+
+
+def _ddg_text(query: str, max_results: int) -> list[dict]:
+    from duckduckgo_search import DDGS
+
+    results = []
+    with DDGS() as ddgs:
+        for r in ddgs.text(query, max_results=max_results):
+            results.append({
+                "title": r.get("title", ""),
+                "url": r.get("href", ""),
+                "snippet": r.get("body", ""),
+            })
+    return results
 
 
 async def _search_fallback(query: str, max_results: int) -> list[dict]:
     try:
-        from duckduckgo_search import DDGS
-
-        results = []
-        with DDGS() as ddgs:
-            for r in ddgs.text(query, max_results=max_results):
-                results.append({
-                    "title": r.get("title", ""),
-                    "url": r.get("href", ""),
-                    "snippet": r.get("body", ""),
-                })
-        return results
+        return await asyncio.to_thread(_ddg_text, query, max_results)
     except Exception as e:
         return [{"title": f"Search error: {e}", "url": "", "snippet": ""}]
 
 
 async def crawl_pages(urls: list[str], max_sources: int = None) -> list[dict]:
-    from .scraper import scrape_url
-
     max_sources = max_sources or settings.web_max_sources_to_crawl
     urls = urls[:max_sources]
 
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import logging
+from functools import lru_cache
+from typing import Iterable
+
 import tiktoken
 
 logger = logging.getLogger(__name__)
@@ -9,54 +12,116 @@ ENCODING = "cl100k_base"
 MAX_CONTEXT_TOKENS = 4500
 MAX_OUTPUT_TOKENS = 1000
 TOKEN_LIMIT = 6000
+USER_PROMPT_TOKENS = 3500
+# Character cap for assembled context, applied before tokenizing. At ~6 chars
+# per token it sits above USER_PROMPT_TOKENS, so the token budget still makes
+# the final cut; it only stops unbounded inputs from being built and encoded.
+CONTEXT_CHAR_BUDGET = USER_PROMPT_TOKENS * 6
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(name: str = ENCODING):
+    return tiktoken.get_encoding(name)
 
 
 def count_tokens(text: str) -> int:
     try:
-        enc = tiktoken.get_encoding(ENCODING)
-        return len(enc.encode(text))
+        return len(_get_encoding(ENCODING).encode(text, disallowed_special=()))
     except Exception:
         return len(text) // 4
 
 
+# Module-level system prompt constants register here so their counts are
+# computed once. Any other text, e.g. a caller-supplied system prompt, is
+# counted fresh and never held in the cache.
+_static_prompts: set[str] = set()
+_static_prompt_tokens: dict[str, int] = {}
+
+
+def register_static_prompts(*prompts: str) -> None:
+    _static_prompts.update(prompts)
+
+
+def is_static_prompt(prompt: str) -> bool:
+    return prompt in _static_prompts
+
+
+def count_prompt_tokens(prompt: str) -> int:
+    """count_tokens, memoized for registered static prompts only."""
+    tokens = _static_prompt_tokens.get(prompt)
+    if tokens is None:
+        tokens = count_tokens(prompt)
+        if is_static_prompt(prompt):
+            _static_prompt_tokens[prompt] = tokens
+    return tokens
+
+
+def join_within_budget(blocks: Iterable[str], sep: str, max_chars: int = CONTEXT_CHAR_BUDGET) -> str:
+    """Join blocks, stopping once max_chars is reached."""
+    parts: list[str] = []
+    used = 0
+    for block in blocks:
+        if used >= max_chars:
+            break
+        parts.append(block)
+        used += len(block) + len(sep)
+    return sep.join(parts)
+
+
+def _message_tokens(message: dict) -> int:
+    # Static system prompts repeat verbatim across calls; their counts are cached.
+    content = message.get("content", "")
+    if message.get("role") == "system":
+        return count_prompt_tokens(content)
+    return count_tokens(content)
+
+
 def truncate_to_token_budget(text: str, budget: int = MAX_CONTEXT_TOKENS) -> str:
-    tokens = count_tokens(text)
-    if tokens <= budget:
-        return text
+    if budget <= 0:
+        return ""
     try:
-        enc = tiktoken.get_encoding(ENCODING)
-        encoded = enc.encode(text)
-        trimmed = encoded[:budget]
-        return enc.decode(trimmed)
+        enc = _get_encoding(ENCODING)
+        encoded = enc.encode(text, disallowed_special=())
     except Exception:
+        tokens = len(text) // 4
+        if tokens <= budget:
+            return text
         ratio = budget / tokens
         cutoff = int(len(text) * ratio)
         return text[:cutoff]
+    if len(encoded) <= budget:
+        return text
+    return enc.decode(encoded[:budget])
 
 
-def shrink_context(messages: list[dict], budget: int = MAX_CONTEXT_TOKENS) -> list[dict]:
-    total = sum(count_tokens(m.get("content", "")) for m in messages)
-    if total <= budget:
+def shrink_context(
+    messages: list[dict],
+    budget: int = MAX_CONTEXT_TOKENS,
+    sizes: list[int] | None = None,
+) -> list[dict]:
+    if sizes is None:
+        sizes = [count_tokens(m.get("content", "")) for m in messages]
+    if sum(sizes) <= budget:
         return messages
 
     shrunk: list[dict] = []
     system_tokens = 0
-    for m in messages:
+    used = 0
+    for m, tokens in zip(messages, sizes):
         if m.get("role") == "system":
-            content = m.get("content", "")
-            system_tokens += count_tokens(content)
+            system_tokens += tokens
             if system_tokens > 500:
-                m["content"] = truncate_to_token_budget(content, 500)
+                m["content"] = truncate_to_token_budget(m.get("content", ""), 500)
+                tokens = count_tokens(m["content"])
                 system_tokens = 500
+            used += tokens
             shrunk.append(m)
 
-    remaining = budget - sum(count_tokens(m.get("content", "")) for m in shrunk)
-    for m in messages:
+    remaining = budget - used
+    for m, tokens in zip(messages, sizes):
         if m.get("role") != "system":
-            content = m.get("content", "")
-            tokens = count_tokens(content)
             if tokens > remaining:
-                m["content"] = truncate_to_token_budget(content, max(remaining, 100))
+                m["content"] = truncate_to_token_budget(m.get("content", ""), max(remaining, 100))
                 remaining = 0
             else:
                 remaining -= tokens
@@ -71,11 +136,12 @@ def check_token_budget(
     max_output: int = MAX_OUTPUT_TOKENS,
     hard_limit: int = TOKEN_LIMIT,
 ) -> list[dict]:
-    total = sum(count_tokens(m.get("content", "")) for m in messages)
-    logger.info("Token budget: prompt=%d, limit=%d, output_budget=%d", total, hard_limit, max_output)
+    sizes = [_message_tokens(m) for m in messages]
+    total = sum(sizes)
+    logger.debug("Token budget: prompt=%d, limit=%d, output_budget=%d", total, hard_limit, max_output)
 
     if total + max_output <= hard_limit:
         return messages
 
     logger.warning("Prompt tokens %d exceeds safe budget %d, shrinking context", total, hard_limit - max_output)
-    return shrink_context(messages, max_context)
+    return shrink_context(messages, max_context, sizes)
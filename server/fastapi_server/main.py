@@ -1,10 +1,15 @@
+import logging
+import queue
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from fastapi.responses import HTMLResponse
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.db import init_db
+from app.services.http import close_http_client
+from app.services.scraper import close_browser
 from app.routers.research import router as research_router
 from app.routers.rag import router as rag_router
 from app.routers.paper import router as paper_router
@@ -13,10 +18,48 @@ from app.routers.ai import router as ai_router
 from app.routers.agents import router as agents_router
 
 
+def _start_log_listener() -> QueueListener | None:
+    """Format and write app.* log records on a background thread.
+
+    Agents log from the event loop and from worker threads; handing records to
+    a queue keeps stream I/O off those paths. The queue sits on the "app"
+    logger with its own StreamHandler, since under plain uvicorn the root
+    logger has no handlers. Propagation is left alone. Returns None if a
+    listener is already installed.
+    """
+    app_logger = logging.getLogger("app")
+    if any(isinstance(h, QueueHandler) for h in app_logger.handlers):
+        return None
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, handler)
+    app_logger.addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+def _stop_log_listener(listener: QueueListener | None) -> None:
+    """Flush the queue and detach its handler from the "app" logger."""
+    if listener is None:
+        return
+    listener.stop()
+    app_logger = logging.getLogger("app")
+    for handler in app_logger.handlers[:]:
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            app_logger.removeHandler(handler)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
-    yield
+    log_listener = _start_log_listener()
+    try:
+        await init_db()
+        yield
+        await close_http_client()
+        await close_browser()
+    finally:
+        _stop_log_listener(log_listener)
 
 
 app = FastAPI(title="Multiagent Research Automation Platform - FastAPI Server", lifespan=lifespan)
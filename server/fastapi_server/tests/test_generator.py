@@ -0,0 +1,46 @@
+import pytest
+
+generator = pytest.importorskip("app.services.generator")
+
+
+def _chat(n_turns: int) -> list[dict]:
+    msgs = [{"role": "system", "content": "sys"}]
+    for i in range(n_turns):
+        msgs.append({"role": "user" if i % 2 == 0 else "assistant", "content": f"t{i}"})
+    return msgs
+
+
+@pytest.fixture
+def window(monkeypatch):
+    def _window(messages, limit):
+        monkeypatch.setattr(generator.settings, "max_context_messages", limit)
+        return generator.BaseGenerator()._window_messages(messages)
+
+    return _window
+
+
+def test_under_limit_is_unchanged(window):
+    msgs = _chat(4)
+    assert window(msgs, 12) is msgs
+
+
+def test_keeps_system_and_opening_turn(window):
+    out = window(_chat(10), 4)
+    assert [m["content"] for m in out] == ["sys", "t0", "t7", "t8", "t9"]
+
+
+def test_system_messages_are_never_dropped(window):
+    msgs = _chat(6)
+    msgs.insert(3, {"role": "system", "content": "mid"})
+    out = window(msgs, 2)
+    assert [m["content"] for m in out] == ["sys", "t0", "mid", "t5"]
+
+
+def test_limit_of_one_keeps_latest_turn(window):
+    out = window(_chat(5), 1)
+    assert [m["content"] for m in out] == ["sys", "t4"]
+
+
+def test_non_positive_limit_disables_windowing(window):
+    msgs = _chat(20)
+    assert window(msgs, 0) is msgs
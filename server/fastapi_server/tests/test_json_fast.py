@@ -0,0 +1,53 @@
+import pytest
+
+from app.services.json_fast import JSONDecodeError, dumps, extract_json, loads
+
+
+def test_bare_object():
+    assert extract_json('{"a": 1, "b": [1, 2]}') == {"a": 1, "b": [1, 2]}
+
+
+def test_fenced_json():
+    text = 'Here you go:\n```json\n{"score": 8, "approved": true}\n```\nThanks.'
+    assert extract_json(text) == {"score": 8, "approved": True}
+
+
+def test_leading_and_trailing_prose():
+    text = 'Sure! The plan is {"plan": "x", "queries": ["q1"]} -- hope that helps {not json}'
+    assert extract_json(text) == {"plan": "x", "queries": ["q1"]}
+
+
+def test_braces_inside_strings():
+    text = 'note {"a": "}{ [ ] {{", "b": {"c": "}"}} trailing }'
+    assert extract_json(text) == {"a": "}{ [ ] {{", "b": {"c": "}"}}
+
+
+def test_escaped_quotes_and_backslashes():
+    text = r'x {"a": "say \"}\" now", "b": "C:\\dir\\", "c": 1} y'
+    assert extract_json(text) == {"a": 'say "}" now', "b": "C:\\dir\\", "c": 1}
+
+
+def test_array_opener():
+    text = 'Sub-questions:\n["what is {x}?", "why [y]?"]\nDone.'
+    assert extract_json(text, "[") == ["what is {x}?", "why [y]?"]
+
+
+def test_array_opener_skips_leading_object_text():
+    text = 'prefix {"ignored": true} then [1, [2, 3]]'
+    assert extract_json(text, "[") == [1, [2, 3]]
+
+
+@pytest.mark.parametrize("text", ["no json here", '{"a": 1', '{"a": "}'])
+def test_missing_or_unbalanced_raises(text):
+    with pytest.raises(JSONDecodeError):
+        extract_json(text)
+
+
+def test_invalid_span_raises():
+    with pytest.raises(JSONDecodeError):
+        extract_json("{'single': 'quotes'}")
+
+
+def test_dumps_roundtrip():
+    obj = {"k": ["é", 1, None]}
+    assert loads(dumps(obj)) == obj
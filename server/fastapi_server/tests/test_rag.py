@@ -0,0 +1,27 @@
+import pytest
+
+rag = pytest.importorskip("app.services.rag")
+
+
+def test_valid_citations_are_kept():
+    text, violations = rag.validate_citations("A [1] and B [2].", 2)
+    assert text == "A [1] and B [2]."
+    assert violations == []
+
+
+def test_out_of_range_citations_are_stripped():
+    text, violations = rag.validate_citations("A [1], B [3], C [0].", 2)
+    assert text == "A [1], B , C ."
+    assert violations == ["3", "0"]
+
+
+def test_no_sources_strips_everything():
+    text, violations = rag.validate_citations("[1][2] done", 0)
+    assert text == " done"
+    assert violations == ["1", "2"]
+
+
+def test_non_numeric_brackets_are_untouched():
+    text, violations = rag.validate_citations("See [a] and [1a] and [ 1 ].", 1)
+    assert text == "See [a] and [1a] and [ 1 ]."
+    assert violations == []
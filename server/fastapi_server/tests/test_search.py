@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+search = pytest.importorskip("app.services.search")
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    calls = []
+    rows = [{"title": "T", "url": "https://example.com", "snippet": "s"}]
+
+    async def fake_provider(name, query, max_results):
+        calls.append(query)
+        return provider.rows
+
+    provider.rows = rows
+    provider.calls = calls
+    now = [1000.0]
+    provider.now = now
+    search._search_cache.clear()
+    monkeypatch.setattr(search, "_search_provider", fake_provider)
+    monkeypatch.setattr(search.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(search.settings, "web_search_cache_ttl", 60)
+    yield provider
+    search._search_cache.clear()
+
+
+def _search(query):
+    return asyncio.run(search.search_web(query, max_results=5))
+
+
+def test_repeat_query_hits_cache(provider):
+    first = _search("Quantum  Computing")
+    second = _search("quantum computing")
+    assert first == second
+    assert provider.calls == ["Quantum  Computing"]
+
+
+def test_entries_expire_after_ttl(provider):
+    _search("q")
+    provider.now[0] += 61
+    _search("q")
+    assert len(provider.calls) == 2
+
+
+def test_error_rows_are_not_cached(provider):
+    provider.rows = [{"title": "error", "url": "", "snippet": ""}]
+    _search("q")
+    _search("q")
+    assert len(provider.calls) == 2
+
+
+def test_callers_get_copies(provider):
+    _search("q")[0]["title"] = "mutated"
+    assert _search("q")[0]["title"] == "T"